@@ -3,10 +3,21 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import multiprocessing
+import os
+import pickle
+import random
+import tempfile
+import time
 import unittest
 
 import isolation
+import endgame
+import evaluation
 import game_agent
+import opening_book
+import sample_players
+import tournament
 
 from importlib import reload
 
@@ -20,6 +31,339 @@ class IsolationTest(unittest.TestCase):
         self.player2 = "Player2"
         self.game = isolation.Board(self.player1, self.player2)
 
+    def test_knight_move_masks(self):
+        masks = isolation.knight_move_masks(7, 7)
+        self.assertEqual(len(masks), 49)
+        # (0, 0) reaches (1, 2) and (2, 1); the center reaches all eight cells
+        self.assertEqual(masks[0], 1 << (1 + 2 * 7) | 1 << (2 + 1 * 7))
+        self.assertEqual(bin(masks[3 + 3 * 7]).count('1'), 8)
+
+    def test_legal_moves(self):
+        self.assertEqual(self.game.count_legal_moves(), 49)
+        self.game.apply_move((3, 3))
+        self.game.apply_move((1, 4))
+        moves = [(2, 1), (4, 1), (1, 2), (5, 2), (5, 4), (2, 5), (4, 5)]
+        self.assertEqual(self.game.get_legal_moves(), moves)
+        self.assertEqual(self.game.count_legal_moves(), 7)
+        self.assertEqual(self.game.count_legal_moves(self.player2),
+                         len(self.game.get_legal_moves(self.player2)))
+        self.assertFalse(self.game.move_is_legal((3, 3)))
+        self.assertEqual(self.game.get_player_location(self.player1), (3, 3))
+
+    def test_push_pop_move(self):
+        self.game.apply_move((3, 3))
+        before = (self.game.to_string(), self.game.hash(), self.game.active_player,
+                  self.game.move_count, self.game.get_legal_moves())
+        self.game.push_move((1, 4))
+        self.game.push_move((1, 2))
+        self.assertEqual(self.game.get_player_location(self.player1), (1, 2))
+        self.game.pop_move()
+        self.game.pop_move()
+        self.assertEqual((self.game.to_string(), self.game.hash(), self.game.active_player,
+                          self.game.move_count, self.game.get_legal_moves()), before)
+
+    def test_search_restores_board(self):
+        player1 = game_agent.AlphaBetaPlayer()
+        player2 = game_agent.MinimaxPlayer()
+        game = isolation.Board(player1, player2)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        before = game.to_string()
+        # Time out part of the way through the search
+        calls = []
+        def time_left():
+            calls.append(1)
+            return 1000 if len(calls) < 500 else 0
+        self.assertIn(player1.get_move(game, time_left), game.get_legal_moves())
+        self.assertEqual(game.to_string(), before)
+        player1.time_left = lambda: 1000
+        self.assertIn(player1.alphabeta(game, 3), game.get_legal_moves())
+        self.assertEqual(game.to_string(), before)
+
+    def test_zobrist_hash(self):
+        self.game.apply_move((3, 3))
+        self.game.apply_move((1, 4))
+        h = self.game.hash()
+        self.assertEqual(self.game.copy().hash(), h)
+        self.game.push_move((1, 2))
+        self.assertNotEqual(self.game.hash(), h)
+        self.game.pop_move()
+        self.assertEqual(self.game.hash(), h)
+        # Boards built by the same moves hash the same, whichever way the moves were made
+        other = isolation.Board(self.player1, self.player2)
+        other.push_move((3, 3))
+        other.apply_move((1, 4))
+        self.assertEqual(other.hash(), h)
+        other.apply_move((1, 2))
+        self.assertNotEqual(other.hash(), h)
+
+    def test_transposition_table(self):
+        table = game_agent.TranspositionTable(size=4)
+        self.assertIsNone(table.lookup(5))
+        table.store(5, 3, 1.5, game_agent.EXACT, (1, 2))
+        self.assertEqual(table.lookup(5), (5, 3, 1.5, game_agent.EXACT, (1, 2), 0))
+        # 9 shares the slot of 5 and only replaces it when searched deeper
+        table.store(9, 2, 0., game_agent.LOWER_BOUND, (0, 0))
+        self.assertIsNone(table.lookup(9))
+        table.store(9, 3, 0., game_agent.LOWER_BOUND, (0, 0))
+        self.assertIsNone(table.lookup(5))
+        self.assertEqual(table.lookup(9)[1:], (3, 0., game_agent.LOWER_BOUND, (0, 0), 0))
+        # In a later generation shallower results replace older entries
+        table.generation += 1
+        table.store(5, 1, 2., game_agent.EXACT, (2, 2))
+        self.assertEqual(table.lookup(5), (5, 1, 2., game_agent.EXACT, (2, 2), 1))
+        table.store(9, 0, 0., game_agent.EXACT, (0, 0))
+        self.assertIsNone(table.lookup(9))
+        table.clear()
+        self.assertIsNone(table.lookup(9))
+
+    def test_alphabeta_table_reuse(self):
+        player1 = game_agent.AlphaBetaPlayer()
+        player2 = game_agent.AlphaBetaPlayer()
+        game = isolation.Board(player1, player2)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        player1.time_left = lambda: 1000
+        scores = [player1.max_value(game, 4, float("-inf"), float("inf"))[0]]
+        # Searching again answers from the table
+        self.assertIsNotNone(player1.cached_value(player1.table.lookup(game.hash()), 4, float("-inf"), float("inf")))
+        scores.append(player1.max_value(game, 4, float("-inf"), float("inf"))[0])
+        player1.table.clear()
+        scores.append(player1.max_value(game, 4, float("-inf"), float("inf"))[0])
+        self.assertEqual(len(set(scores)), 1)
+
+    def test_new_game_clears_table(self):
+        player = game_agent.AlphaBetaPlayer()
+
+        def searched(game):
+            start = time.time()
+            player.get_move(game, lambda: 30 - (time.time() - start) * 1000)
+            return [entry for entry in player.table.slots if entry is not None]
+
+        game = isolation.Board(player, self.player2)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        searched(game)
+        # Later moves of the same game keep the older entries
+        game.apply_move(game.get_legal_moves()[0])
+        game.apply_move(game.get_legal_moves()[0])
+        self.assertTrue(any(entry[5] < player.table.generation for entry in searched(game)))
+        # The same player in the other seat, further into a game, starts afresh
+        game = isolation.Board(self.player2, player)
+        for move in [(0, 0), (3, 3), (1, 2), (2, 4), (2, 0)]:
+            game.apply_move(move)
+        self.assertTrue(all(entry[5] == player.table.generation for entry in searched(game)))
+
+    def test_move_ordering(self):
+        player = game_agent.AlphaBetaPlayer()
+        moves = [(0, 1), (1, 0), (2, 3), (3, 2)]
+        entry = (0, 1, 0., game_agent.EXACT, (3, 2))
+        player.killers[2] = [(2, 3)]
+        player.history[(True, (1, 0))] = 4
+        self.assertEqual(player.order_moves(moves, entry, 2, True),
+                         [(3, 2), (2, 3), (1, 0), (0, 1)])
+        self.assertEqual(player.order_moves(moves, None, 0, False), moves)
+        self.assertEqual(game_agent.AlphaBetaPlayer(ordering=()).order_moves(moves, entry, 2, True), moves)
+        with self.assertRaises(ValueError):
+            game_agent.AlphaBetaPlayer(ordering=('pv', 'random'))
+
+    def test_search_stats(self):
+        player1 = game_agent.AlphaBetaPlayer()
+        player2 = game_agent.AlphaBetaPlayer()
+        game = isolation.Board(player1, player2)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        player1.time_left = lambda: 1000
+        for depth in range(1, 5):
+            player1.alphabeta(game, depth)
+        stats = player1.stats.report()
+        self.assertTrue(stats['nodes'] > stats['expanded'] >= stats['cutoffs'] > 0)
+        self.assertTrue(0 < stats['cutoff_rate'] <= 1)
+        player1.stats.reset()
+        self.assertEqual(player1.stats.nodes, 0)
+
+    def test_pvs_and_aspiration(self):
+        opening = [(3, 3), (2, 4), (1, 2), (4, 3)]
+        scores = []
+        for options in ({}, {'pvs': True}, {'aspiration': 1.}, {'pvs': True, 'aspiration': 1.}):
+            player1 = game_agent.AlphaBetaPlayer(**options)
+            game = isolation.Board(player1, game_agent.AlphaBetaPlayer())
+            for move in opening:
+                game.apply_move(move)
+            player1.time_left = lambda: 1000
+            score = None
+            for depth in range(1, 6):
+                score, move = player1.aspiration_search(game, depth, score)
+                self.assertIn(move, game.get_legal_moves())
+            scores.append(score)
+        self.assertEqual(len(set(scores)), 1)
+
+    def test_parallel_search(self):
+        player1 = game_agent.AlphaBetaPlayer(processes=2)
+        player2 = game_agent.MinimaxPlayer()
+        game = isolation.Board(player1, player2)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        player1.time_left = lambda: 1000
+        # Players are pickled with a fresh table and without pool or timer
+        player1.table.store(1, 1, 0., game_agent.EXACT, (0, 0))
+        copy = pickle.loads(pickle.dumps(player1))
+        self.assertIsNone(copy.table.lookup(1))
+        self.assertIsNone(copy.time_left)
+        # The opponent is replaced on the board sent to the search processes
+        board = game.copy({player2: "Opponent"})
+        self.assertEqual(board.get_opponent(player1), "Opponent")
+        self.assertEqual(board.hash(), game.hash())
+        try:
+            start = time.time()
+            time_left = lambda: 150 - (time.time() - start) * 1000
+            self.assertIn(player1.get_move(game, time_left), game.get_legal_moves())
+            self.assertTrue(time_left() > 0)
+            self.assertTrue(player1.stats.nodes > 0)
+        finally:
+            player1.close()
+
+    def test_tournament_statistics(self):
+        self.assertAlmostEqual(tournament.expected_score(tournament.elo(0.75)), 0.75)
+        self.assertEqual(tournament.elo(0.5), 0.)
+        low, high = tournament.wilson_interval(8, 10)
+        self.assertTrue(0.45 < low < 0.8 < high < 0.95)
+        value, low, high = tournament.elo_interval(8, 10)
+        self.assertTrue(low < value < high)
+        # Eleven straight wins decide an even pairing, equal results never do
+        self.assertEqual(tournament.sprt(11, 0)[1], "H1")
+        self.assertEqual(tournament.sprt(0, 11)[1], "H0")
+        self.assertIsNone(tournament.sprt(20, 20)[1])
+
+    def test_play_round(self):
+        cpu_agent = tournament.Agent(sample_players.RandomPlayer(), "Random")
+        test_agents = [tournament.Agent(sample_players.GreedyPlayer(), "Greedy"),
+                       tournament.Agent(sample_players.RandomPlayer(), "Random 2")]
+        pool = tournament.make_pool(1)
+        try:
+            for round_pool in (None, pool):
+                win_counts = {agent.player: 0 for agent in [cpu_agent] + test_agents}
+                tournament.play_round(cpu_agent, test_agents, win_counts, 3, round_pool)
+                # Every match is a game as first and as second player against each test agent
+                self.assertEqual(sum(win_counts.values()), 2 * 3 * len(test_agents))
+                for agent in test_agents:
+                    self.assertTrue(0 <= win_counts[agent.player] <= 2 * 3)
+        finally:
+            pool.terminate()
+        if hasattr(os, "sched_setaffinity"):
+            affinity = os.sched_getaffinity(0)
+            cpu = min(affinity)
+            try:
+                # Workers take the CPUs in start order, and then run unpinned
+                started = multiprocessing.Value('i', 0)
+                tournament._pin_worker([cpu], started)
+                self.assertEqual(os.sched_getaffinity(0), {cpu})
+                with self.assertWarns(UserWarning):
+                    tournament._pin_worker([cpu], started)
+                self.assertEqual(started.value, 2)
+            finally:
+                os.sched_setaffinity(0, affinity)
+
+    def test_opening_book(self):
+        book = opening_book.build_book(plies=2, depth=2, processes=1)
+        # The empty board, and every first move up to symmetry
+        self.assertEqual(len(book), 1 + 49)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            opening_book.save_book(book, path)
+            self.assertEqual(opening_book.load_book(path), book)
+            with self.assertRaises(ValueError):
+                opening_book.load_book(path, 5, 5)
+        # Rotated positions get rotated replies
+        rotate = opening_book.symmetries()[5]
+        reply = book[opening_book.replay([(0, 1)]).hash()]
+        self.assertEqual(book[opening_book.replay([rotate(0, 1)]).hash()], rotate(*reply))
+        player1 = game_agent.AlphaBetaPlayer(opening_book=book)
+        game = isolation.Board(player1, self.player2)
+        self.assertEqual(player1.get_move(game, lambda: 0), book[game.hash()])
+        # Pickled players, such as tournament players, keep their book
+        copy = pickle.loads(pickle.dumps(player1))
+        self.assertEqual(copy.opening_book, book)
+        self.assertEqual(copy.get_move(game, lambda: 0), book[game.hash()])
+
+    def test_endgame(self):
+        moves = isolation.knight_move_masks(5, 5)
+
+        def longest(cell, open_mask):
+            # Plain depth-first search, without memo or ordering
+            return max([1 + longest(idx, open_mask & ~(1 << idx))
+                        for idx in range(25) if moves[cell] & open_mask & (1 << idx)] or [0])
+
+        rnd = random.Random(7)
+        solved_games = 0
+        while solved_games < 10:
+            game = isolation.Board(self.player1, self.player2, 5, 5)
+            while game.get_legal_moves() and not (game.move_count >= 2 and endgame.separated(game)):
+                game.apply_move(rnd.choice(game.get_legal_moves()))
+            if not game.get_legal_moves():
+                continue
+            solved_games += 1
+            move, own, opponent, exact = endgame.solve(game)
+            self.assertTrue(exact)
+            self.assertIn(move, game.get_legal_moves())
+            cells = [loc[0] + loc[1] * 5 for loc in
+                     (game.get_player_location(game.active_player),
+                      game.get_player_location(game.inactive_player))]
+            open_mask = game.blank_mask()
+            self.assertEqual((own, opponent), tuple(longest(cell, open_mask) for cell in cells))
+            game.apply_move(move)
+            self.assertEqual(longest(move[0] + move[1] * 5, open_mask & ~(1 << (move[0] + move[1] * 5))), own - 1)
+        # Without nodes to spend, lengths are lower bounds
+        solver = endgame.LongestPath(moves, max_nodes=0)
+        self.assertEqual(solver.length(0, (1 << 25) - 2), 0)
+        self.assertFalse(solver.exact)
+
+    def test_endgame_move(self):
+        player1 = game_agent.AlphaBetaPlayer()
+        player2 = game_agent.AlphaBetaPlayer()
+        rnd = random.Random(3)
+        game = isolation.Board(player1, player2)
+        while not (game.move_count >= 2 and endgame.separated(game)):
+            game.apply_move(rnd.choice(game.get_legal_moves()))
+        move = endgame.solve(game)[0]
+        self.assertEqual(game.active_player.get_move(game, lambda: 1000), move)
+
+    def test_evaluation(self):
+        self.assertEqual(game_agent.custom_score.weights, (1, 2))
+        self.assertEqual(evaluation.mobility(self.game, self.player1), (49, 49))
+        rnd = random.Random(11)
+        for _ in range(20):
+            game = isolation.Board(self.player1, self.player2)
+            for _ in range(rnd.randint(0, 25)):
+                if not game.get_legal_moves():
+                    break
+                game.apply_move(rnd.choice(game.get_legal_moves()))
+            moves = game.get_legal_moves()
+            for score_fn in (game_agent.custom_score, game_agent.custom_score_3):
+                for player in (self.player1, self.player2):
+                    self.assertEqual(evaluation.successor_scores(game, player, score_fn, moves),
+                                     [score_fn(game.forecast_move(move), player) for move in moves])
+        self.assertIsNone(evaluation.successor_scores(self.game, self.player1, lambda game, player: 0., []))
+        # (0, 0) against a player that has not moved; then a player with no moves to make
+        scores = evaluation.batch_scores((1, 1), [(1 << 49) - 2, 0], [0, 0], [49, 49], [True, True])
+        self.assertEqual(scores, [2. - 48., float("-inf")])
+
+    @unittest.skipIf(evaluation.np is None, "NumPy is not installed")
+    def test_batch_scores_numpy(self):
+        rnd = random.Random(5)
+        count = evaluation.NUMPY_MIN_BATCH
+        blanks = [rnd.getrandbits(49) for _ in range(count)]
+        own_cells = [rnd.randrange(50) for _ in range(count)]
+        opp_cells = [rnd.randrange(50) for _ in range(count)]
+        own_to_move = [rnd.random() < 0.5 for _ in range(count)]
+        # Blank boards around a cornered player give wins and losses too
+        blanks[:4] = [0, 0, 1 << 10, 1 << 10]
+        scores = evaluation.batch_scores((2, 1), blanks, own_cells, opp_cells, own_to_move)
+        self.assertNotIsInstance(scores, list)
+        expected = [evaluation.batch_scores((2, 1), [blank], [own], [opp], [mine])[0]
+                    for blank, own, opp, mine in zip(blanks, own_cells, opp_cells, own_to_move)]
+        self.assertEqual(scores.tolist(), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,181 @@
+"""Exact play once the players of an Isolation game are separated.
+
+When no open cell can be reached by both players, they can no longer block
+each other and the game becomes two independent longest path problems: the
+player to move wins exactly when its longest knight path through its own
+region is longer than the opponent's. The best move is then the first move of
+a longest path, found by a depth-first search memoized on (cell, open cells)
+rather than by minimax with a heuristic.
+
+Cells are numbered like in `isolation.knight_move_masks`: cell (row, col) is
+index ``row + col * height``.
+"""
+from isolation import knight_move_masks
+
+# Longest path searches stop after this many nodes and play the longest path
+# found so far
+MAX_NODES = 20000
+
+
+def _cells(mask):
+    """Yield the indices of the cells of a mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def reachable(moves, cell, open_mask):
+    """Flood fill the open cells reachable from a cell by knight moves.
+
+    Parameters
+    ----------
+    moves : tuple<int>
+        The knight move masks of the board, see `knight_move_masks`.
+
+    cell : int
+        Index of the starting cell, which does not have to be open.
+
+    open_mask : int
+        The cells that can be moved through.
+
+    Returns
+    -------
+    int
+        The mask of the reachable cells, not including cell itself.
+    """
+    reached = 0
+    frontier = moves[cell] & open_mask
+    while frontier:
+        reached |= frontier
+        successors = 0
+        for idx in _cells(frontier):
+            successors |= moves[idx]
+        frontier = successors & open_mask & ~reached
+    return reached
+
+
+def regions(game):
+    """Return the cell indices and the regions (reachable open cells) of the
+    active and the inactive player, or None if a player has not moved yet.
+    """
+    moves = knight_move_masks(game.width, game.height)
+    blank = game.blank_mask()
+    result = []
+    for player in (game.active_player, game.inactive_player):
+        location = game.get_player_location(player)
+        if location is None:
+            return None
+        cell = location[0] + location[1] * game.height
+        result.append((cell, reachable(moves, cell, blank)))
+    return result
+
+
+def separated(game):
+    """Return True if the players cannot reach a common open cell."""
+    found = regions(game)
+    return found is not None and not found[0][1] & found[1][1]
+
+
+class LongestPath:
+    """Longest knight paths through a set of open cells, by depth-first
+    search memoized on the current cell and the open cells it can still
+    reach.
+
+    The search is bounded by a node count and optionally a timer. Once
+    either runs out, unexplored branches count as paths of length zero, so
+    the lengths found are lower bounds and `exact` is False.
+
+    Parameters
+    ----------
+    moves : tuple<int>
+        The knight move masks of the board, see `knight_move_masks`.
+
+    max_nodes : int (optional)
+        Number of positions to expand before stopping.
+
+    time_left : callable (optional)
+        A function returning the milliseconds left, as passed to get_move().
+
+    threshold : float (optional)
+        Stop when time_left() falls below this many milliseconds.
+    """
+    def __init__(self, moves, max_nodes=MAX_NODES, time_left=None, threshold=0.):
+        self.moves = moves
+        self.max_nodes = max_nodes
+        self.time_left = time_left
+        self.threshold = threshold
+        self.nodes = 0
+        self.exact = True
+        self.memo = {}
+
+    def out_of_budget(self):
+        if not self.exact:
+            return True
+        if self.nodes >= self.max_nodes or (
+                self.time_left is not None and self.time_left() < self.threshold):
+            self.exact = False
+        return not self.exact
+
+    def best(self, cell, open_mask, floor=-1):
+        """Return the length of the longest path from cell through open_mask
+        and the first cell of that path (None if there are no moves).
+
+        If no path can be longer than floor, (0, None) is returned without
+        searching.
+        """
+        # Only the cells still reachable matter, which also bounds the length
+        open_mask = reachable(self.moves, cell, open_mask)
+        key = (cell, open_mask)
+        if key in self.memo:
+            return self.memo[key]
+        bound = bin(open_mask).count('1')
+        if bound <= floor or self.out_of_budget():
+            return 0, None
+        self.nodes += 1
+
+        length, first = 0, None
+        # Warnsdorff's rule: cells with the fewest onward moves first, which
+        # finds long paths early and makes bounded searches good guesses
+        successors = sorted(_cells(self.moves[cell] & open_mask),
+                            key=lambda idx: bin(self.moves[idx] & open_mask).count('1'))
+        for idx in successors:
+            path = 1 + self.best(idx, open_mask & ~(1 << idx), length - 1)[0]
+            if path > length:
+                length, first = path, idx
+                if length == bound:
+                    break
+        if self.exact:
+            self.memo[key] = (length, first)
+        return length, first
+
+    def length(self, cell, open_mask):
+        """Return the length of the longest path from cell through open_mask."""
+        return self.best(cell, open_mask)[0]
+
+
+def solve(game, max_nodes=MAX_NODES, time_left=None, threshold=0., opponent=True):
+    """Find the best move of the active player if the players are separated.
+
+    The node and time budget is shared by both longest path searches; the
+    opponent's is skipped when opponent is False, which is all a player
+    needs to choose its move.
+
+    Returns
+    -------
+    ((int, int), int, int, bool) or None
+        None if the players can still reach a common cell. Otherwise the
+        first move of the active player's longest path ((-1, -1) if it has
+        no moves), its length, the length of the opponent's longest path
+        (None if skipped), and whether the lengths are exact. The active
+        player wins exactly when its path is the longer one.
+    """
+    found = regions(game)
+    if found is None or found[0][1] & found[1][1]:
+        return None
+    (own_cell, own_region), (opp_cell, opp_region) = found
+    solver = LongestPath(knight_move_masks(game.width, game.height), max_nodes, time_left, threshold)
+    own_length, first = solver.best(own_cell, own_region)
+    opp_length = solver.length(opp_cell, opp_region) if opponent else None
+    move = (-1, -1) if first is None else (first % game.height, first // game.height)
+    return move, own_length, opp_length, solver.exact
@@ -0,0 +1,183 @@
+"""Mobility evaluation for Isolation heuristics.
+
+Most heuristics score a position by the number of moves open to each player.
+On the bitboard a player's moves are one AND of its knight move mask with the
+blank cells, so counting them is a popcount (`Board.count_legal_moves`) and
+never builds the list of moves.
+
+Heuristics of the form ``own_weight * own_moves - opp_weight * opp_moves``
+declare their weights with the `weights` decorator and compute their score
+from them with `weighted_mobility`, so the weights are the only copy of the
+formula. The search can then
+score all the successors of a node at the last ply in one batch, straight
+from the masks and without making the moves (see `successor_scores`). Large
+batches of positions are scored with NumPy when it is installed, and with
+plain integers otherwise.
+"""
+from isolation import knight_move_masks
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Batches smaller than this are scored in pure Python, which beats the
+# overhead of building arrays
+NUMPY_MIN_BATCH = 64
+
+_tables = {}
+
+
+def weights(own_weight, opp_weight):
+    """Declare a heuristic as the weighted mobility difference
+
+        own_weight * own_moves - opp_weight * opp_moves
+
+    with losses scored -inf and wins +inf, so that `successor_scores` and
+    `batch_scores` can compute it without calling the function. The
+    function itself is returned unchanged, with a `weights` attribute, and
+    should return `weighted_mobility` of its own weights.
+    """
+    def decorate(score_fn):
+        score_fn.weights = (own_weight, opp_weight)
+        return score_fn
+    return decorate
+
+
+def mobility(game, player):
+    """Return the number of legal moves of player and of its opponent."""
+    return (game.count_legal_moves(player),
+            game.count_legal_moves(game.get_opponent(player)))
+
+
+def weighted_mobility(game, player, score_weights):
+    """Score a position with a weighted mobility heuristic: -inf if player
+    has lost, +inf if it has won, and otherwise
+
+        own_weight * own_moves - opp_weight * opp_moves
+
+    where score_weights is (own_weight, opp_weight), see `weights`.
+    """
+    if game.is_loser(player):
+        return float("-inf")
+
+    if game.is_winner(player):
+        return float("inf")
+
+    own_weight, opp_weight = score_weights
+    own_moves = game.count_legal_moves(player) if own_weight else 0
+    opp_moves = game.count_legal_moves(game.get_opponent(player)) if opp_weight else 0
+    return float(own_weight * own_moves - opp_weight * opp_moves)
+
+
+def _move_table(width, height):
+    """The knight move masks of a board, followed by the mask of every cell
+    for a player that has not moved yet.
+    """
+    key = (width, height)
+    if key not in _tables:
+        _tables[key] = knight_move_masks(width, height) + ((1 << (width * height)) - 1,)
+    return _tables[key]
+
+
+def _popcounts(masks):
+    """Popcount every mask of a list, with NumPy for large batches."""
+    if np is None or len(masks) < NUMPY_MIN_BATCH:
+        return [bin(mask).count('1') for mask in masks]
+    array = np.array(masks, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(array).astype(np.int64)
+    return np.unpackbits(array.view(np.uint8)).reshape(len(masks), 64).sum(axis=1)
+
+
+def batch_scores(score_weights, blanks, own_cells, opp_cells, own_to_move, width=7, height=7):
+    """Score a batch of positions with a weighted mobility heuristic.
+
+    Positions are given as parallel sequences (lists or NumPy arrays); a
+    cell of width * height stands for a player that has not moved yet and
+    may move to any blank cell.
+
+    Parameters
+    ----------
+    score_weights : (float, float)
+        The weights of own and opponent moves, see `weights`.
+
+    blanks : sequence<int>
+        The blank cell mask of every position, see `Board.blank_mask`.
+
+    own_cells, opp_cells : sequence<int>
+        Cell index (row + col * height) of the scoring player and of its
+        opponent in every position.
+
+    own_to_move : sequence<bool>
+        Whether the scoring player is the active player of every position.
+
+    Returns
+    -------
+    list<float> or numpy.ndarray
+        The score of every position, -inf if the player to move is the
+        scoring player and has no moves, +inf if it is the opponent.
+    """
+    own_weight, opp_weight = score_weights
+    masks = _move_table(width, height)
+    count = len(blanks)
+    own = _popcounts([masks[cell] & blank for cell, blank in zip(own_cells, blanks)])
+    opp = _popcounts([masks[cell] & blank for cell, blank in zip(opp_cells, blanks)])
+
+    if np is not None and count >= NUMPY_MIN_BATCH:
+        to_move = np.asarray(own_to_move, dtype=bool)
+        scores = own_weight * own.astype(float) - opp_weight * opp.astype(float)
+        stuck = np.where(to_move, own, opp) == 0
+        return np.where(stuck, np.where(to_move, -np.inf, np.inf), scores)
+
+    inf = float("inf")
+    scores = []
+    for own_moves, opp_moves, mine in zip(own, opp, own_to_move):
+        if (own_moves if mine else opp_moves) == 0:
+            scores.append(-inf if mine else inf)
+        else:
+            scores.append(float(own_weight * own_moves - opp_weight * opp_moves))
+    return scores
+
+
+def successor_scores(game, player, score_fn, moves):
+    """Score the position after each move of the active player, without
+    making the moves, if score_fn declares its `weights`. A node has too few
+    moves for NumPy to pay off, so this is the pure Python path of
+    `batch_scores` specialized to successors.
+
+    Returns
+    -------
+    list<float> or None
+        score_fn(successor, player) for every move, or None if score_fn is
+        not a weighted mobility heuristic.
+    """
+    score_weights = getattr(score_fn, 'weights', None)
+    if score_weights is None:
+        return None
+    height = game.height
+    masks = _move_table(game.width, height)
+    blank = game.blank_mask()
+    # The player that is not moving stays where it is, and is the one to
+    # move after the move
+    waiting = game.get_player_location(game.inactive_player)
+    waiting = len(masks) - 1 if waiting is None else waiting[0] + waiting[1] * height
+    mover_is_player = player == game.active_player
+
+    own_weight, opp_weight = score_weights
+    waiting_mask = masks[waiting]
+    inf = float("inf")
+    scores = []
+    for row, col in moves:
+        cell = row + col * height
+        after = blank & ~(1 << cell)
+        waiting_moves = bin(waiting_mask & after).count('1')
+        if not waiting_moves:
+            scores.append(inf if mover_is_player else -inf)
+            continue
+        mover_moves = bin(masks[cell] & after).count('1')
+        if mover_is_player:
+            scores.append(float(own_weight * mover_moves - opp_weight * waiting_moves))
+        else:
+            scores.append(float(own_weight * waiting_moves - opp_weight * mover_moves))
+    return scores
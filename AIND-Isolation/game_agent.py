@@ -2,7 +2,12 @@
 test your agent's strength against a set of known agents using tournament.py
 and include the results in your report.
 """
+import multiprocessing
 import random
+import time
+
+import endgame
+import evaluation
 
 
 class SearchTimeout(Exception):
@@ -10,6 +15,171 @@ class SearchTimeout(Exception):
     pass
 
 
+# Bound types of transposition table values
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# Move ordering heuristics of AlphaBetaPlayer, in order of precedence
+ORDERINGS = ('pv', 'killers', 'history')
+
+# Width of the null windows of principal variation search, below the
+# smallest difference between two scores that matters
+PVS_EPSILON = 1e-6
+
+
+class _Opponent:
+    """Stands in for the opponent on boards sent to search processes, so that
+    the real opponent never has to be pickled.
+    """
+    pass
+
+
+def _search_split(task):
+    """Run iterative deepening over a share of the root moves in a search
+    process, until the wall clock deadline (in seconds since the epoch).
+
+    Returns
+    -------
+    (list, int)
+        The best (score, move) of the share at every completed depth, from
+        depth 1 up, and the number of nodes visited.
+    """
+    game, player, moves, deadline = task
+    player.time_left = lambda: (deadline - time.time()) * 1000
+    player.stats.reset()
+    results = []
+    try:
+        depth = 1
+        while player.time_left() > 0:
+            score, move = player.split_search(game, depth, moves)
+            results.append((score, move))
+            # Search the best move first at the next depth
+            moves.remove(move)
+            moves.insert(0, move)
+            depth += 1
+    except SearchTimeout:
+        pass
+    return results, player.stats.nodes
+
+
+class TranspositionTable:
+    """Fixed-size cache of search results keyed by `Board.hash()`.
+
+    Every position maps to one slot (the low bits of its hash). Within a
+    search a slot is overwritten only by a result searched at least as deep
+    as the one it holds, so the expensive results of early iterations
+    survive the many shallow ones of later iterations. Results stored by an
+    earlier search (an older `generation`) are always overwritten, so that
+    deep entries about positions the game has left do not crowd out the
+    current ones.
+
+    Parameters
+    ----------
+    size : int (optional)
+        Number of slots, rounded up to a power of two.
+    """
+    def __init__(self, size=1 << 16):
+        size = 1 << max(0, size - 1).bit_length()
+        self.mask = size - 1
+        self.slots = [None] * size
+        # Incremented by the player at the start of every move
+        self.generation = 0
+
+    def lookup(self, key):
+        """Return the (key, depth, value, flag, move, generation) entry
+        stored for the position with hash key, or None.
+        """
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        """Store a search result unless its slot holds a deeper one from
+        the current generation.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the position.
+
+        depth : int
+            The depth the position was searched to.
+
+        value : float
+            The score found by the search.
+
+        flag : int
+            EXACT, LOWER_BOUND if the search failed high (the true score is
+            at least value) or UPPER_BOUND if it failed low.
+
+        move : (int, int)
+            The best move found in the position.
+        """
+        idx = key & self.mask
+        entry = self.slots[idx]
+        if entry is None or depth >= entry[1] or entry[5] != self.generation:
+            self.slots[idx] = (key, depth, value, flag, move, self.generation)
+
+    def clear(self):
+        """Forget every stored result."""
+        self.slots = [None] * len(self.slots)
+
+
+class SearchStats:
+    """Counters of the searches made by an AlphaBetaPlayer, accumulated over
+    every call to get_move() until reset() is called.
+
+    Attributes
+    ----------
+    nodes : int
+        Nodes visited, including leaves and transposition table hits.
+
+    expanded : int
+        Nodes whose successors were searched.
+
+    cutoffs : int
+        Expanded nodes that stopped early on an alpha or beta cutoff.
+
+    first_move_cutoffs : int
+        Cutoffs caused by the first successor searched, the ideal case for
+        move ordering.
+
+    table_hits : int
+        Nodes answered from the transposition table.
+
+    researches : int
+        Null window searches of principal variation search and aspiration
+        window searches that failed and were searched again.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.expanded = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.table_hits = 0
+        self.researches = 0
+
+    def cutoff_rate(self):
+        """Fraction of expanded nodes that were cut off."""
+        return self.cutoffs / self.expanded if self.expanded else 0.
+
+    def first_move_cutoff_rate(self):
+        """Fraction of cutoffs caused by the first successor searched."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.
+
+    def report(self):
+        """Return the counters and rates as a dict."""
+        return {'nodes': self.nodes, 'expanded': self.expanded,
+                'cutoffs': self.cutoffs, 'first_move_cutoffs': self.first_move_cutoffs,
+                'table_hits': self.table_hits, 'researches': self.researches,
+                'cutoff_rate': self.cutoff_rate(),
+                'first_move_cutoff_rate': self.first_move_cutoff_rate()}
+
+
+@evaluation.weights(1, 2)
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -36,17 +206,10 @@ def custom_score(game, player):
     """
     # Aggressive version of improved score heuristic from sample_players.py
     # Player chases opponent to try and limit their moves
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
-    return float(own_moves - 2 * opp_moves)
+    return evaluation.weighted_mobility(game, player, custom_score.weights)
 
 
+@evaluation.weights(1, 3)
 def custom_score_2(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -70,17 +233,10 @@ def custom_score_2(game, player):
         The heuristic value of the current game state to the specified player.
     """
     # More aggressive version of improved score heuristic from sample_players.py
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
-    return float(own_moves - 3 * opp_moves)
+    return evaluation.weighted_mobility(game, player, custom_score_2.weights)
 
 
+@evaluation.weights(2, 1)
 def custom_score_3(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -105,15 +261,7 @@ def custom_score_3(game, player):
     """
     # Defensive? version of improved score heuristic from sample_players.py
     # Player tries to maximize their moves available compared to the opponent
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
-    return float(2 * own_moves - opp_moves)
+    return evaluation.weighted_mobility(game, player, custom_score_3.weights)
 
 
 class IsolationPlayer:
@@ -239,8 +387,15 @@ class MinimaxPlayer(IsolationPlayer):
             raise SearchTimeout()
 
         # Find the move with max utility by recursively iterating through each
-        # successor (the opponent's min-nodes)
-        eval_moves = [(self.min_value(game.forecast_move(move), depth-1), move) for move in game.get_legal_moves()]
+        # successor (the opponent's min-nodes). Moves are made and taken back
+        # on the same board instead of copying it for every successor.
+        eval_moves = []
+        for move in game.get_legal_moves():
+            game.push_move(move)
+            try:
+                eval_moves.append((self.min_value(game, depth-1), move))
+            finally:
+                game.pop_move()
 
         if (len(eval_moves) > 0):
             best_score, best_move = max(eval_moves)
@@ -264,7 +419,11 @@ class MinimaxPlayer(IsolationPlayer):
         score = float("inf")
 
         for move in game.get_legal_moves():
-            score = min(score, self.max_value(game.forecast_move(move), depth-1))
+            game.push_move(move)
+            try:
+                score = min(score, self.max_value(game, depth-1))
+            finally:
+                game.pop_move()
 
         return score
 
@@ -283,7 +442,11 @@ class MinimaxPlayer(IsolationPlayer):
         score = float("-inf")
 
         for move in game.get_legal_moves():
-            score = max(score, self.min_value(game.forecast_move(move), depth-1))
+            game.push_move(move)
+            try:
+                score = max(score, self.min_value(game, depth-1))
+            finally:
+                game.pop_move()
 
         return score
 
@@ -291,7 +454,109 @@ class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Results are cached in a transposition table, so positions reached again
+    by later iterations or through other move orders are not searched again.
+    Successors are searched best first according to the move ordering
+    heuristics, and `stats` counts nodes and cutoffs.
+
+    Parameters
+    ----------
+    table_size : int (optional)
+        Number of transposition table slots.
+
+    ordering : tuple (optional)
+        The move ordering heuristics to use, any of ORDERINGS:
+        'pv' tries the best move of the previous, shallower search of a
+        position first (along the principal variation of the previous
+        iterative deepening depth, this is the principal variation),
+        'killers' then tries the last two moves that caused a cutoff at the
+        same ply, and 'history' sorts the rest by how often and how deep each
+        move caused cutoffs. An empty tuple searches moves in board order.
+
+    pvs : bool (optional)
+        Principal variation search: every successor after the first is
+        searched with a null window that only tells whether it beats the
+        best score so far, and searched again with the full window if it
+        does. Pays off when the first successor is usually the best one.
+
+    aspiration : float or None (optional)
+        Half width of the aspiration window. Each iterative deepening depth
+        after the first is searched with a window this wide around the
+        score of the previous depth, and searched again with the failing
+        side opened if its score falls outside. None always searches with
+        the full window.
+
+    processes : int (optional)
+        Number of processes to search with. Above 1, the root moves are
+        split between a pool of processes, kept between moves until close()
+        is called, that each run iterative deepening over their share; the
+        best move of the deepest depth that every process completed is
+        played. The processes start every move with an empty transposition
+        table.
+
+    margin : float (optional)
+        Milliseconds before the timeout at which the search processes stop,
+        left to collect their results.
+
+    opening_book : dict or None (optional)
+        Moves to play without searching, by `Board.hash()` of the position,
+        such as a book loaded by `opening_book.load_book()`.
+
+    endgame_nodes : int (optional)
+        Once the players are separated (see `endgame.separated`), the player
+        stops searching and plays the first move of its longest path through
+        its own region, found by `endgame.LongestPath` within this many
+        nodes and the time limit. 0 keeps searching to the end of the game.
+
+    See IsolationPlayer for the other parameters.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 table_size=1 << 16, ordering=ORDERINGS, pvs=False, aspiration=None,
+                 processes=1, margin=20., opening_book=None,
+                 endgame_nodes=endgame.MAX_NODES):
+        super().__init__(search_depth, score_fn, timeout)
+        unknown = set(ordering) - set(ORDERINGS)
+        if unknown:
+            raise ValueError("Unknown move ordering heuristics: {}".format(sorted(unknown)))
+        self.table = TranspositionTable(table_size)
+        self.ordering = tuple(ordering)
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.processes = processes
+        self.margin = margin
+        self._pool = None
+        self.opening_book = opening_book
+        self.endgame_nodes = endgame_nodes
+        self.stats = SearchStats()
+        # Up to two killer moves per ply from the root of the current search
+        self.killers = {}
+        # Cutoff score of every (node type, move), node type True for max nodes
+        self.history = {}
+        self._root_move_count = 0
+        self._last_move_count = None
+        # Board size, opponent and seat of the game of the last move
+        self._last_game = None
+
+    def __getstate__(self):
+        # The pool and the timer cannot be pickled, and search processes get
+        # an empty transposition table rather than a copy of this one
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['time_left'] = None
+        state['table'] = len(self.table.slots)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.table = TranspositionTable(state['table'])
+
+    def close(self):
+        """Shut down the search processes, if any were started."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -325,6 +590,43 @@ class AlphaBetaPlayer(IsolationPlayer):
         """
         self.time_left = time_left
 
+        # Cached values are from this player's point of view in its seat,
+        # which the position hash does not encode, so a new opponent, seat
+        # or board size starts afresh. So does a board with fewer moves than
+        # last time, a new game whose positions will not meet the cached ones
+        first_player = (game.active_player == self) == (game.move_count % 2 == 0)
+        game_key = (game.width, game.height, id(game.get_opponent(self)), first_player)
+        if game_key != self._last_game or (
+                self._last_move_count is not None and game.move_count < self._last_move_count):
+            self.table.clear()
+            self.history.clear()
+        self._last_game = game_key
+        self._last_move_count = game.move_count
+        # Entries from earlier moves stay usable but no longer block stores
+        self.table.generation += 1
+
+        # Killers are indexed by ply from the root, which has moved on; old
+        # history scores fade so that the current position dominates
+        self.killers.clear()
+        for key in self.history:
+            self.history[key] //= 2
+
+        if self.opening_book:
+            move = self.opening_book.get(game.hash())
+            # Hashes may collide, never play an illegal book move
+            if move is not None and game.move_is_legal(move):
+                return move
+
+        # Separated players only have to make their own path last longest
+        if self.endgame_nodes:
+            solved = endgame.solve(game, self.endgame_nodes, self.time_left,
+                                   self.TIMER_THRESHOLD, opponent=False)
+            if solved is not None:
+                return solved[0]
+
+        if self.processes > 1:
+            return self.parallel_move(game)
+
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
@@ -333,8 +635,9 @@ class AlphaBetaPlayer(IsolationPlayer):
             # Initialize search_depth at 0, and increment it while there is
             # time remaining
             search_depth = 0
+            score = None
             while (self.time_left() > 0):
-                best_move = self.alphabeta(game, search_depth)
+                score, best_move = self.aspiration_search(game, search_depth, score)
                 search_depth += 1
 
         except SearchTimeout:
@@ -395,10 +698,91 @@ class AlphaBetaPlayer(IsolationPlayer):
         # successor (the opponent's min-nodes) while caching:
         # alpha: lower bound of utility to compare against when pruning
         # beta: upper bound of utility to compare against when pruning
+        self._root_move_count = game.move_count
         best_score, best_move = self.max_value(game, depth, alpha, beta)
 
         return best_move
 
+    def aspiration_search(self, game, depth, guess):
+        """Search the root with an aspiration window around guess, the score
+        of the previous iterative deepening depth, if aspiration windows are
+        enabled and guess is a finite score.
+
+        Returns
+        -------
+        (float, tuple)
+            The score of the root and the best move
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise SearchTimeout()
+        self._root_move_count = game.move_count
+        inf = float("inf")
+        if self.aspiration is None or guess is None or abs(guess) == inf:
+            return self.max_value(game, depth, -inf, inf)
+
+        alpha, beta = guess - self.aspiration, guess + self.aspiration
+        best_score, best_move = self.max_value(game, depth, alpha, beta)
+        # Outside the window the score is only a bound, and the move may not
+        # be the best one: search again with the failing side opened
+        if best_score <= alpha:
+            self.stats.researches += 1
+            best_score, best_move = self.max_value(game, depth, -inf, beta)
+        elif best_score >= beta:
+            self.stats.researches += 1
+            best_score, best_move = self.max_value(game, depth, alpha, inf)
+        return best_score, best_move
+
+    def parallel_move(self, game):
+        """Choose a move by splitting the root moves between the search
+        processes, returning their results before the timeout.
+        """
+        moves = game.get_legal_moves()
+        if len(moves) < 2:
+            return moves[0] if moves else (-1, -1)
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.processes)
+
+        # The processes stop margin ms early, which leaves time to collect
+        # their results
+        deadline = time.time() + (self.time_left() - self.margin) / 1000.
+        # The book is only consulted before the search starts, so the search
+        # processes get a copy of this player without it
+        searcher = object.__new__(type(self))
+        searcher.__dict__.update(self.__dict__, opening_book=None)
+        board = game.copy({self: searcher, game.get_opponent(self): _Opponent()})
+        shares = min(self.processes, len(moves))
+        tasks = [(board, searcher, moves[i::shares], deadline) for i in range(shares)]
+        pending = self._pool.map_async(_search_split, tasks)
+        try:
+            results = pending.get(max(self.time_left() - self.TIMER_THRESHOLD, 0) / 1000.)
+        except multiprocessing.TimeoutError:
+            return moves[0]
+
+        self.stats.nodes += sum(nodes for _, nodes in results)
+        depth = min(len(scores) for scores, _ in results)
+        if depth == 0:
+            return moves[0]
+        return max((scores[depth-1] for scores, _ in results), key=lambda result: result[0])[1]
+
+    def split_search(self, game, depth, moves):
+        """Search the given root moves, a share of the legal moves of game,
+        with alpha-beta pruning.
+
+        Returns
+        -------
+        (float, tuple)
+            The best score and move among moves
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise SearchTimeout()
+        self._root_move_count = game.move_count
+        best_score, best_move = float("-inf"), moves[0]
+        for i, move in enumerate(moves):
+            score = self.search_successor(game, move, depth, best_score, float("inf"), i == 0, True)
+            if score > best_score:
+                best_score, best_move = score, move
+        return best_score, best_move
+
     def min_value(self, game, depth, alpha, beta):
         """Minimax-Decision helper function that returns a utility value and
         associated move for a min-node given values of alpha and beta
@@ -411,6 +795,7 @@ class AlphaBetaPlayer(IsolationPlayer):
         # Check for timeout
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.stats.nodes += 1
 
         best_score = float("inf")
         best_move = (-1, -1)
@@ -418,19 +803,38 @@ class AlphaBetaPlayer(IsolationPlayer):
         # Check for max depth reached
         if depth == 0: return (self.score(game, self), best_move)
 
-        # Iterate over successors
-        for move in game.get_legal_moves():
+        # Reuse the result of an earlier search of this position, if it was
+        # at least as deep and its bound decides this window
+        key = game.hash()
+        entry = self.table.lookup(key)
+        cached = self.cached_value(entry, depth, alpha, beta)
+        if cached is not None: return cached
+        alpha_orig, beta_orig = alpha, beta
+
+        # Score the successors in one batch if they are leaves
+        if depth == 1:
+            leaves = self.score_leaves(game, key, False)
+            if leaves is not None: return leaves
+
+        # Iterate over successors, most promising first
+        ply = game.move_count - self._root_move_count
+        moves = self.order_moves(game.get_legal_moves(), entry, ply, False)
+        self.stats.expanded += 1
+        for i, move in enumerate(moves):
             # Calculate utility of this successor given current alpha and beta values
-            score = self.max_value(game.forecast_move(move), depth-1, alpha, beta)[0]
+            score = self.search_successor(game, move, depth, alpha, beta, i == 0, False)
             if score < best_score:
                 best_score = score
                 best_move = move
             # If new best_score is <= alpha, prune the remaining nodes
             # because this path will not be chosen
-            if best_score <= alpha: return (best_score, move)
+            if best_score <= alpha:
+                self.record_cutoff(move, depth, ply, i, False)
+                break
             # Else update beta with new best_score to be passed to max_value helper
             beta = min(beta, best_score)
 
+        self.store_value(key, depth, alpha_orig, beta_orig, best_score, best_move)
         return (best_score, best_move)
 
     def max_value(self, game, depth, alpha, beta):
@@ -445,6 +849,7 @@ class AlphaBetaPlayer(IsolationPlayer):
         # Check for timeout
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.stats.nodes += 1
 
         best_score = float("-inf")
         best_move = (-1, -1)
@@ -452,17 +857,167 @@ class AlphaBetaPlayer(IsolationPlayer):
         # Check for max depth reached
         if depth == 0: return (self.score(game, self), best_move)
 
-        # Iterate over successors
-        for move in game.get_legal_moves():
+        # Reuse the result of an earlier search of this position, if it was
+        # at least as deep and its bound decides this window
+        key = game.hash()
+        entry = self.table.lookup(key)
+        cached = self.cached_value(entry, depth, alpha, beta)
+        if cached is not None: return cached
+        alpha_orig, beta_orig = alpha, beta
+
+        # Score the successors in one batch if they are leaves
+        if depth == 1:
+            leaves = self.score_leaves(game, key, True)
+            if leaves is not None: return leaves
+
+        # Iterate over successors, most promising first
+        ply = game.move_count - self._root_move_count
+        moves = self.order_moves(game.get_legal_moves(), entry, ply, True)
+        self.stats.expanded += 1
+        for i, move in enumerate(moves):
             # Calculate utility of this successor given current alpha and beta values
-            score = self.min_value(game.forecast_move(move), depth-1, alpha, beta)[0]
+            score = self.search_successor(game, move, depth, alpha, beta, i == 0, True)
             if score > best_score:
                 best_score = score
                 best_move = move
             # If new best_score is >= beta, prune the remaining nodes
             # because this path will not be chosen
-            if best_score >= beta: return (best_score, move)
+            if best_score >= beta:
+                self.record_cutoff(move, depth, ply, i, True)
+                break
             # Else update alpha with new best_score to be passed to min_value helper
             alpha = max(alpha, best_score)
 
+        self.store_value(key, depth, alpha_orig, beta_orig, best_score, best_move)
         return (best_score, best_move)
+
+    def score_leaves(self, game, key, maximizing):
+        """Score every successor of a node at depth 1 at once with
+        `evaluation.successor_scores`, which needs no moves to be made.
+
+        Returns
+        -------
+        (float, tuple) or None
+            The best score and move of the node, or None if the heuristic
+            does not declare its weights and the successors have to be
+            searched one by one.
+        """
+        moves = game.get_legal_moves()
+        scores = evaluation.successor_scores(game, self, self.score, moves)
+        if scores is None:
+            return None
+        self.stats.expanded += 1
+        self.stats.nodes += len(moves)
+
+        best_score = float("-inf") if maximizing else float("inf")
+        best_move = (-1, -1)
+        for score, move in zip(scores, moves):
+            if (score > best_score) if maximizing else (score < best_score):
+                best_score, best_move = score, move
+        # Every successor was scored, so the value is exact whatever the window
+        self.table.store(key, 1, best_score, EXACT, best_move)
+        return (best_score, best_move)
+
+    def search_successor(self, game, move, depth, alpha, beta, first, maximizing):
+        """Return the score of the successor reached by move from a node of
+        the given depth, searched with the (alpha, beta) window, or with a
+        null window first under principal variation search.
+
+        Parameters
+        ----------
+        first : bool
+            Whether move is the first successor searched, which principal
+            variation search always searches with the full window.
+
+        maximizing : bool
+            True if the node is a max node, False for min nodes.
+        """
+        inf = float("inf")
+        search = self.min_value if maximizing else self.max_value
+        game.push_move(move)
+        try:
+            # A null window needs a finite bound on the side being tested
+            if first or not self.pvs or (alpha if maximizing else -beta) == -inf:
+                return search(game, depth-1, alpha, beta)[0]
+            if maximizing:
+                score = search(game, depth-1, alpha, alpha + PVS_EPSILON)[0]
+            else:
+                score = search(game, depth-1, beta - PVS_EPSILON, beta)[0]
+            # The null window only showed that the successor is better than
+            # the best so far; find out by how much
+            if alpha < score < beta:
+                self.stats.researches += 1
+                score = search(game, depth-1, alpha, beta)[0]
+            return score
+        finally:
+            game.pop_move()
+
+    def cached_value(self, entry, depth, alpha, beta):
+        """Decide whether a transposition table entry answers a search.
+
+        Returns
+        -------
+        (float, tuple) or None
+            The cached score and best move if the entry was searched at least
+            depth plies deep and is exact or a bound outside the (alpha, beta)
+            window, None otherwise.
+        """
+        if entry is None or entry[1] < depth:
+            return None
+        _, _, value, flag, move, _ = entry
+        if (flag == EXACT or (flag == LOWER_BOUND and value >= beta) or
+                (flag == UPPER_BOUND and value <= alpha)):
+            self.stats.table_hits += 1
+            return (value, move)
+        return None
+
+    def order_moves(self, moves, entry, ply, maximizing):
+        """Sort moves so that the ones most likely to cause a cutoff come
+        first, according to the enabled ordering heuristics.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            The legal moves of the node.
+
+        entry : tuple or None
+            The transposition table entry of the node, whose best move is the
+            principal variation move.
+
+        ply : int
+            Distance of the node from the root of the search.
+
+        maximizing : bool
+            True for max nodes, False for min nodes.
+        """
+        if not self.ordering or len(moves) < 2:
+            return moves
+        pv_move = entry[4] if entry is not None and 'pv' in self.ordering else None
+        killers = self.killers.get(ply, ()) if 'killers' in self.ordering else ()
+        history = self.history if 'history' in self.ordering else {}
+        return sorted(moves, reverse=True, key=lambda move: (
+            move == pv_move, move in killers, history.get((maximizing, move), 0)))
+
+    def record_cutoff(self, move, depth, ply, index, maximizing):
+        """Count a cutoff and remember the move that caused it."""
+        self.stats.cutoffs += 1
+        if index == 0:
+            self.stats.first_move_cutoffs += 1
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        key = (maximizing, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def store_value(self, key, depth, alpha, beta, value, move):
+        """Store a search result with the bound type implied by the window
+        (alpha, beta) it was searched with.
+        """
+        if value <= alpha:
+            flag = UPPER_BOUND
+        elif value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.table.store(key, depth, value, flag, move)
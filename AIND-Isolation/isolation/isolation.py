@@ -13,6 +13,84 @@ from copy import copy
 
 TIME_LIMIT_MILLIS = 150
 
+# Knight move offsets as (row, column) deltas
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+_move_masks = {}
+_zobrist_keys = {}
+
+# Seed of the Zobrist keys, fixed so hashes are the same in every process
+ZOBRIST_SEED = 0x150
+
+
+def knight_move_masks(width, height):
+    """Return the knight moves from every cell of a board as bitmasks.
+
+    Cells are numbered column by column, so cell (row, col) is bit
+    ``row + col * height``. The masks are computed once per board size and
+    shared by every board of that size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    tuple<int>
+        For every cell index, the mask of the cells a knight can reach from
+        it without leaving the board.
+    """
+    key = (width, height)
+    if key not in _move_masks:
+        masks = []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            mask = 0
+            for dr, dc in DIRECTIONS:
+                if 0 <= r + dr < height and 0 <= c + dc < width:
+                    mask |= 1 << (r + dr + (c + dc) * height)
+            masks.append(mask)
+        _move_masks[key] = tuple(masks)
+    return _move_masks[key]
+
+
+def zobrist_keys(width, height):
+    """Return the random keys used to hash the boards of a given size.
+
+    The hash of a board is the XOR of the key of every blocked cell, the
+    location key of each player for the cell it stands on, and the
+    initiative key when player 2 is to move, so a move updates it with three
+    or four XORs. Keys come from a generator with a fixed seed and are cached
+    per board size, so equal positions hash equally across boards and runs.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    (tuple<int>, (tuple<int>, tuple<int>), int)
+        The blocked cell keys, the location keys of player 1 and player 2 by
+        cell index, and the initiative key, all 64 bit integers.
+    """
+    key = (width, height)
+    if key not in _zobrist_keys:
+        rng = random.Random(ZOBRIST_SEED)
+        cells = width * height
+        blocked = tuple(rng.getrandbits(64) for _ in range(cells))
+        locations = tuple(tuple(rng.getrandbits(64) for _ in range(cells)) for _ in range(2))
+        _zobrist_keys[key] = (blocked, locations, rng.getrandbits(64))
+    return _zobrist_keys[key]
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -46,14 +124,26 @@ class Board(object):
         self._active_player = player_1
         self._inactive_player = player_2
 
-        # The last 3 entries of the board state includes initiative (0 for
-        # player 1, 1 for player 2) player 2 last move, and player 1 last move
-        self._board_state = [Board.BLANK] * (width * height + 3)
-        self._board_state[-1] = Board.NOT_MOVED
-        self._board_state[-2] = Board.NOT_MOVED
+        # The board state is a bitmask of the blocked cells (bit
+        # row + col * height), the cell index of each player's last move
+        # (player 1 first) and the initiative (0 for player 1, 1 for player 2)
+        self._blocked = 0
+        self._locations = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self._initiative = 0
+        self._full = (1 << (width * height)) - 1
+        self._moves = knight_move_masks(width, height)
+        self._coords = [(idx % height, idx // height) for idx in range(width * height)]
+        # Zobrist hash of the state, updated by every move
+        self._zobrist = zobrist_keys(width, height)
+        self._hash = 0
+        # What push_move() changed, for pop_move() to restore
+        self._undo = []
 
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the Zobrist hash of the current state, maintained
+        incrementally as moves are applied. See zobrist_keys().
+        """
+        return self._hash
 
     @property
     def active_player(self):
@@ -90,13 +180,25 @@ class Board(object):
             return self._active_player
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
-    def copy(self):
-        """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+    def copy(self, players=None):
+        """ Return a deep copy of the current board.
+
+        Parameters
+        ----------
+        players : dict (optional)
+            Player objects to register on the copy in place of the current
+            ones, keyed by the player they replace.
+        """
+        players = players or {}
+        swap = lambda player: players.get(player, player)
+        new_board = Board(swap(self._player_1), swap(self._player_2), width=self.width, height=self.height)
         new_board.move_count = self.move_count
-        new_board._active_player = self._active_player
-        new_board._inactive_player = self._inactive_player
-        new_board._board_state = copy(self._board_state)
+        new_board._active_player = swap(self._active_player)
+        new_board._inactive_player = swap(self._inactive_player)
+        new_board._blocked = self._blocked
+        new_board._locations = copy(self._locations)
+        new_board._initiative = self._initiative
+        new_board._hash = self._hash
         return new_board
 
     def forecast_move(self, move):
@@ -118,6 +220,30 @@ class Board(object):
         new_board.apply_move(move)
         return new_board
 
+    def push_move(self, move):
+        """Apply a move in place and remember how to take it back, so that
+        search can walk the game tree on a single board instead of copying it
+        at every node. Every push_move() must be matched by a pop_move().
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        slot = int(self._active_player == self._player_2)
+        self._undo.append((self._blocked, slot, self._locations[slot], self._hash))
+        self._move(slot, move[0] + move[1] * self.height)
+
+    def pop_move(self):
+        """Take back the last move applied with push_move(), restoring the
+        board to the state it was in before that move.
+        """
+        self._blocked, slot, self._locations[slot], self._hash = self._undo.pop()
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
     def move_is_legal(self, move):
         """Test whether a move is legal in the current game state.
 
@@ -134,13 +260,18 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
-                self._board_state[idx] == Board.BLANK)
+                not self._blocked >> idx & 1)
 
     def get_blank_spaces(self):
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        return self._mask_moves(self.blank_mask())
+
+    def blank_mask(self):
+        """Return the locations that are still available as a bitmask, with
+        bit ``row + col * height`` set for blank cell (row, col).
+        """
+        return self._full & ~self._blocked
 
     def get_player_location(self, player):
         """Find the current location of the specified player on the board.
@@ -157,19 +288,15 @@ class Board(object):
             if the player has not moved.
         """
         if player == self._player_1:
-            if self._board_state[-1] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-1]
+            idx = self._locations[0]
         elif player == self._player_2:
-            if self._board_state[-2] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-2]
+            idx = self._locations[1]
         else:
             raise RuntimeError(
                 "Invalid player in get_player_location: {}".format(player))
-        w = idx // self.height
-        h = idx % self.height
-        return (h, w)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._coords[idx]
 
     def get_legal_moves(self, player=None):
         """Return the list of all legal moves for the specified player.
@@ -186,9 +313,24 @@ class Board(object):
             The list of coordinate pairs (row, column) of all legal moves
             for the player constrained by the current game state.
         """
-        if player is None:
-            player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+        return self._mask_moves(self._legal_mask(player))
+
+    def count_legal_moves(self, player=None):
+        """Return the number of legal moves for the specified player, without
+        building the list of moves.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            count the legal moves for the active player on the board.
+
+        Returns
+        -------
+        int
+            The number of legal moves, equal to len(get_legal_moves(player)).
+        """
+        return bin(self._legal_mask(player)).count('1')
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -199,21 +341,29 @@ class Board(object):
             A coordinate pair (row, column) indicating the next position for
             the active player on the board.
         """
-        idx = move[0] + move[1] * self.height
-        last_move_idx = int(self.active_player == self._player_2) + 1
-        self._board_state[-last_move_idx] = idx
-        self._board_state[idx] = 1
-        self._board_state[-3] ^= 1
+        self._move(int(self.active_player == self._player_2), move[0] + move[1] * self.height)
+
+    def _move(self, slot, idx):
+        """Move the active player, stored in location slot, to cell idx."""
+        blocked_keys, location_keys, initiative_key = self._zobrist
+        old = self._locations[slot]
+        h = self._hash ^ blocked_keys[idx] ^ location_keys[slot][idx] ^ initiative_key
+        if old != Board.NOT_MOVED:
+            h ^= location_keys[slot][old]
+        self._hash = h
+        self._locations[slot] = idx
+        self._blocked |= 1 << idx
+        self._initiative ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return player == self._inactive_player and not self.count_legal_moves(self._active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return player == self._active_player and not self.count_legal_moves(self._active_player)
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -237,7 +387,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self.count_legal_moves(self._active_player):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -247,20 +397,35 @@ class Board(object):
 
         return 0.
 
-    def __get_moves(self, loc):
-        """Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+    def _legal_mask(self, player=None):
+        """Return the bitmask of the cells the player can move to with an
+        L-shaped motion (like a knight in chess), or of every blank cell if
+        the player has not moved yet.
         """
-        if loc == Board.NOT_MOVED:
-            return self.get_blank_spaces()
-
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
-        return valid_moves
+        if player is None:
+            player = self.active_player
+        if player == self._player_1:
+            idx = self._locations[0]
+        elif player == self._player_2:
+            idx = self._locations[1]
+        else:
+            raise RuntimeError(
+                "Invalid player in get_legal_moves: {}".format(player))
+        if idx == Board.NOT_MOVED:
+            return self._full & ~self._blocked
+        return self._moves[idx] & ~self._blocked
+
+    def _mask_moves(self, mask):
+        """Convert a bitmask of cells into the list of their (row, column)
+        coordinates, in cell index order.
+        """
+        coords = self._coords
+        moves = []
+        while mask:
+            bit = mask & -mask
+            moves.append(coords[bit.bit_length() - 1])
+            mask ^= bit
+        return moves
 
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
@@ -271,8 +436,8 @@ class Board(object):
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
-        p1_loc = self._board_state[-1]
-        p2_loc = self._board_state[-2]
+        p1_loc = self._locations[0]
+        p2_loc = self._locations[1]
 
         col_margin = len(str(self.height - 1)) + 1
         prefix = "{:<" + "{}".format(col_margin) + "}"
@@ -282,7 +447,7 @@ class Board(object):
             out += prefix.format(i) + ' | '
             for j in range(self.width):
                 idx = i + j * self.height
-                if not self._board_state[idx]:
+                if not self._blocked >> idx & 1:
                     out += ' '
                 elif p1_loc == idx:
                     out += symbols[0]
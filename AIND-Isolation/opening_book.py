@@ -0,0 +1,200 @@
+"""Build an opening book of best replies by offline search.
+
+The book maps the `Board.hash()` of every position reached in the first few
+plies of a game to the move a fixed-depth alpha-beta search found best, so an
+AlphaBetaPlayer given the book plays its opening moves with a single dict
+lookup (see the `opening_book` parameter of AlphaBetaPlayer).
+
+Positions are searched in parallel, and only once per symmetry class: the
+reply found for a position is stored for each of its rotations and
+reflections (8 on square boards, 4 otherwise).
+
+Books are stored as a small header and one (hash, cell) record per position,
+9 bytes each.
+
+Usage:
+    python opening_book.py book.bin [--plies 4] [--depth 6] [--processes N] [--score custom_score]
+"""
+import argparse
+import multiprocessing
+import struct
+
+import game_agent
+import sample_players
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer
+
+MAGIC = b'ISOB\x01'
+# width, height, number of records
+HEADER = struct.Struct('<BBI')
+# position hash, cell index (row + col * height) of the reply
+RECORD = struct.Struct('<QB')
+
+# Heuristics the book can be searched with, by name
+SCORES = {name: getattr(module, name) for module, names in (
+    (game_agent, ('custom_score', 'custom_score_2', 'custom_score_3')),
+    (sample_players, ('improved_score', 'open_move_score', 'center_score')))
+    for name in names}
+
+# Registered on the boards searched as the opponent of the searching player
+OPPONENT = "Opponent"
+
+
+def symmetries(width=7, height=7):
+    """Return the symmetries of a board, as functions mapping a cell
+    (row, col) to its image. Knight moves map to knight moves under all of
+    them, so a position and its images have the same best replies.
+    """
+    h, w = height - 1, width - 1
+    maps = [lambda r, c: (r, c), lambda r, c: (h - r, c),
+            lambda r, c: (r, w - c), lambda r, c: (h - r, w - c)]
+    if width == height:
+        maps += [lambda r, c: (c, r), lambda r, c: (h - c, r),
+                 lambda r, c: (c, w - r), lambda r, c: (h - c, w - r)]
+    return maps
+
+
+def replay(moves, player_1="Player1", player_2="Player2", width=7, height=7):
+    """Return a new board with the moves applied."""
+    board = Board(player_1, player_2, width, height)
+    for move in moves:
+        board.apply_move(move)
+    return board
+
+
+def book_positions(plies=4, width=7, height=7):
+    """Return the move sequences leading to the positions to book: one
+    position of every symmetry class reached in fewer than plies moves,
+    excluding positions without legal moves.
+    """
+    maps = symmetries(width, height)
+    positions = []
+    seen = set()
+    frontier = [()]
+    for _ in range(plies):
+        successors = []
+        for moves in frontier:
+            legal_moves = replay(moves, width=width, height=height).get_legal_moves()
+            if not legal_moves:
+                continue
+            positions.append(moves)
+            for move in legal_moves:
+                child = moves + (move,)
+                images = [replay([f(*m) for m in child], width=width, height=height).hash()
+                          for f in maps]
+                if not seen.intersection(images):
+                    seen.add(images[0])
+                    successors.append(child)
+        frontier = successors
+    return positions
+
+
+def best_reply(task):
+    """Search the position reached by a move sequence to a fixed depth.
+
+    The task is a (moves, depth, score_fn, width, height) tuple. Returns the
+    best move found for the player to move.
+    """
+    moves, depth, score_fn, width, height = task
+    player = AlphaBetaPlayer(score_fn=score_fn)
+    player.time_left = lambda: float("inf")
+    if len(moves) % 2 == 0:
+        board = replay(moves, player, OPPONENT, width, height)
+    else:
+        board = replay(moves, OPPONENT, player, width, height)
+    # Iterative deepening fills the table and orders the deeper searches
+    reply = (-1, -1)
+    for d in range(1, depth + 1):
+        reply = player.alphabeta(board, d)
+    return reply
+
+
+def build_book(plies=4, depth=6, score_fn=game_agent.custom_score, processes=None,
+               width=7, height=7):
+    """Search every position of the first plies of a game and return the
+    book of best replies.
+
+    Parameters
+    ----------
+    plies : int
+        Positions reached in fewer than plies moves are booked.
+
+    depth : int
+        Search depth of every position.
+
+    score_fn : callable
+        The heuristic to search with, which has to be picklable.
+
+    processes : int or None
+        Number of processes to search with, one per CPU if None; 1 searches
+        in this process.
+
+    Returns
+    -------
+    dict
+        The best reply (row, col) by `Board.hash()` of the position.
+    """
+    positions = book_positions(plies, width, height)
+    tasks = [(moves, depth, score_fn, width, height) for moves in positions]
+    if processes == 1:
+        replies = list(map(best_reply, tasks))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            replies = pool.map(best_reply, tasks, chunksize=1)
+
+    book = {}
+    for moves, reply in zip(positions, replies):
+        if reply == (-1, -1):
+            continue
+        for f in symmetries(width, height):
+            board = replay([f(*m) for m in moves], width=width, height=height)
+            book[board.hash()] = f(*reply)
+    return book
+
+
+def save_book(book, path, width=7, height=7):
+    """Write a book to a file."""
+    with open(path, 'wb') as f:
+        f.write(MAGIC + HEADER.pack(width, height, len(book)))
+        for key, (row, col) in book.items():
+            f.write(RECORD.pack(key, row + col * height))
+
+
+def load_book(path, width=7, height=7):
+    """Read a book written by save_book() for boards of the given size.
+
+    Returns
+    -------
+    dict
+        The best reply (row, col) by `Board.hash()` of the position.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not an opening book".format(path))
+        book_width, book_height, count = HEADER.unpack(f.read(HEADER.size))
+        if (book_width, book_height) != (width, height):
+            raise ValueError("{} is a book for {}x{} boards".format(path, book_width, book_height))
+        data = f.read(count * RECORD.size)
+    if len(data) != count * RECORD.size:
+        raise ValueError("{} is truncated".format(path))
+    return {key: (idx % height, idx // height) for key, idx in RECORD.iter_unpack(data)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an Isolation opening book by offline search.")
+    parser.add_argument('book', help="the file to write")
+    parser.add_argument('--plies', type=int, default=4, help="book the positions of the first PLIES moves")
+    parser.add_argument('--depth', type=int, default=6, help="search depth of every position")
+    parser.add_argument('--processes', type=int, help="search processes (default: one per CPU)")
+    parser.add_argument('--score', choices=sorted(SCORES), default='custom_score',
+                        help="heuristic to search with")
+    args = parser.parse_args(argv)
+
+    book = build_book(args.plies, args.depth, SCORES[args.score], args.processes)
+    save_book(book, args.book)
+    print("{} positions written to {}".format(len(book), args.book))
+
+
+if __name__ == "__main__":
+    main()
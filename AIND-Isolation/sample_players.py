@@ -8,7 +8,10 @@ own agent and example heuristic functions.
 
 from random import randint
 
+import evaluation
 
+
+@evaluation.weights(0, 0)
 def null_score(game, player):
     """This heuristic presumes no knowledge for non-terminal states, and
     returns the same uninformative value for all other states.
@@ -30,15 +33,10 @@ def null_score(game, player):
         The heuristic value of the current game state.
     """
 
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    return 0.
+    return evaluation.weighted_mobility(game, player, null_score.weights)
 
 
+@evaluation.weights(1, 0)
 def open_move_score(game, player):
     """The basic evaluation function described in lecture that outputs a score
     equal to the number of moves open for your computer player on the board.
@@ -59,15 +57,10 @@ def open_move_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    return float(len(game.get_legal_moves(player)))
+    return evaluation.weighted_mobility(game, player, open_move_score.weights)
 
 
+@evaluation.weights(1, 1)
 def improved_score(game, player):
     """The "Improved" evaluation function discussed in lecture that outputs a
     score equal to the difference in the number of moves available to the
@@ -89,15 +82,7 @@ def improved_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
-    return float(own_moves - opp_moves)
+    return evaluation.weighted_mobility(game, player, improved_score.weights)
 
 
 def center_score(game, player):
@@ -10,8 +10,25 @@ The matches are fair because the board is initialized randomly for both
 players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
+
+Matches are played in parallel by a pool of processes, each pinned to its own
+CPU where the platform allows it, so that agents do not compete for cores and
+their per-move timeouts mean the same as in a serial run.
+
+With --sprt, every pairing of a test agent and an opponent is played as a
+sequential probability ratio test instead of a fixed number of matches: the
+pairing stops as soon as the results decide whether the test agent is
+stronger or weaker than its opponent, or after --max-matches matches. Results
+are reported as Elo differences with 95% confidence intervals.
+
+Usage:
+    python tournament.py [--processes N] [--sprt [--max-matches M]]
 """
+import argparse
 import itertools
+import math
+import multiprocessing
+import os
 import random
 import warnings
 
@@ -26,6 +43,14 @@ from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
 NUM_MATCHES = 20  # number of matches against each opponent
 TIME_LIMIT = 200  # number of milliseconds before timeout
 
+# Sequential testing: H0 is that the test agent is SPRT_ELO[0] Elo stronger
+# than its opponent, H1 that it is SPRT_ELO[1] Elo stronger, accepted with
+# false positive and false negative rates SPRT_ERRORS
+SPRT_ELO = (-50., 50.)
+SPRT_ERRORS = (0.05, 0.05)
+MAX_MATCHES = 100  # matches before a pairing is left undecided
+Z_95 = 1.959964  # normal quantile of a 95% confidence interval
+
 DESCRIPTION = """
 This script evaluates the performance of the custom_score evaluation
 function against a baseline agent using alpha-beta search and iterative
@@ -37,31 +62,92 @@ game_agent.py.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
-    """Compare the test agents to the cpu agent in "fair" matches.
+def available_cpus():
+    """Return the CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
 
-    "Fair" matches use random starting locations and force the agents to
-    play as both first and second player to control for advantages resulting
-    from choosing better opening moves or having first initiative to move.
+
+def _pin_worker(cpus, started):
+    """Pool initializer that pins each worker process to a CPU of its own.
+
+    The n-th worker to start takes cpus[n], counting with the shared integer
+    started. Workers started to replace others find the CPUs all taken, and
+    run unpinned with a warning.
+    """
+    with started.get_lock():
+        index = started.value
+        started.value += 1
+    if index < len(cpus):
+        os.sched_setaffinity(0, {cpus[index]})
+    else:
+        warnings.warn("Match process {} runs unpinned, all {} CPUs are taken"
+                      .format(os.getpid(), len(cpus)))
+
+
+def make_pool(processes):
+    """Start a pool of match processes, pinned to separate CPUs when there
+    are at least as many CPUs as processes.
+    """
+    cpus = available_cpus()
+    if len(cpus) < processes:
+        warnings.warn("{} processes share {} CPUs, agents may time out more "
+                      "often than in a serial tournament".format(processes, len(cpus)))
+        return multiprocessing.Pool(processes)
+    if not hasattr(os, "sched_setaffinity"):
+        return multiprocessing.Pool(processes)
+    started = multiprocessing.Value('i', 0)
+    return multiprocessing.Pool(processes, initializer=_pin_worker,
+                                initargs=(cpus[:processes], started))
+
+
+def random_opening():
+    """Choose a random move and response to initialize a match with."""
+    board = Board("Player1", "Player2")
+    opening = []
+    for _ in range(2):
+        move = random.choice(board.get_legal_moves())
+        board.apply_move(move)
+        opening.append(move)
+    return opening
+
+
+def play_match(task):
+    """Play every game of one fair match from the same opening.
+
+    The task is a (cpu_player, test_players, opening) tuple. The games are
+    the cpu player against every test player, as first and as second player.
+
+    Returns the index of the winner of every game in [cpu_player] +
+    test_players, and the termination of the last game. Players are
+    identified by index because matches played by a worker process return
+    copies of them.
+    """
+    cpu_player, test_players, opening = task
+    players = [cpu_player] + list(test_players)
+    games = sum([[Board(cpu_player, player), Board(player, cpu_player)]
+                 for player in test_players], [])
+    winners = []
+    for game in games:
+        for move in opening:
+            game.apply_move(move)
+        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        winners.append(players.index(winner))
+    return winners, termination
+
+
+def tally(cpu_agent, test_agents, win_counts, results):
+    """Add the results of play_match() to win_counts and return the number
+    of matches whose last game ended by timeout and by forfeit.
     """
+    players = [cpu_agent.player] + [agent.player for agent in test_agents]
     timeout_count = 0
     forfeit_count = 0
-    for _ in range(num_matches):
-
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
-
-        # initialize all games with a random move and response
-        for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
-
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
+    for winners, termination in results:
+        for index in winners:
+            win_counts[players[index]] += 1
+        winner = players[winners[-1]]
 
         if termination == "timeout":
             timeout_count += 1
@@ -71,14 +157,92 @@ def play_round(cpu_agent, test_agents, win_counts, num_matches):
     return timeout_count, forfeit_count
 
 
+def expected_score(elo):
+    """The expected score of a player elo Elo stronger than its opponent."""
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def elo(score):
+    """The Elo difference implied by a score (fraction of games won)."""
+    if score <= 0.:
+        return float("-inf")
+    if score >= 1.:
+        return float("inf")
+    return 400. * math.log10(score / (1. - score))
+
+
+def wilson_interval(wins, games, z=Z_95):
+    """The Wilson score interval of the win rate of wins out of games."""
+    if not games:
+        return 0., 1.
+    p = wins / games
+    center = (p + z * z / (2 * games)) / (1 + z * z / games)
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return max(center - half, 0.), min(center + half, 1.)
+
+
+def elo_interval(wins, games, z=Z_95):
+    """The Elo difference of wins out of games and its confidence interval,
+    the Wilson interval of the win rate converted to Elo.
+    """
+    low, high = wilson_interval(wins, games, z)
+    return elo(wins / games if games else .5), elo(low), elo(high)
+
+
+def sprt(wins, losses, elo0=SPRT_ELO[0], elo1=SPRT_ELO[1], errors=SPRT_ERRORS):
+    """Sequential probability ratio test of H0: the Elo difference is elo0
+    against H1: it is elo1, on games that cannot be drawn.
+
+    Returns
+    -------
+    (float, str or None)
+        The log likelihood ratio of the results, and "H0" or "H1" once one
+        of them is accepted, None while more games are needed.
+    """
+    p0, p1 = expected_score(elo0), expected_score(elo1)
+    llr = wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+    alpha, beta = errors
+    if llr >= math.log((1 - beta) / alpha):
+        return llr, "H1"
+    if llr <= math.log(beta / (1 - alpha)):
+        return llr, "H0"
+    return llr, None
+
+
+def match_tasks(cpu_agent, test_agents, num_matches):
+    """The play_match() tasks of a round, each with a random opening."""
+    test_players = [agent.player for agent in test_agents]
+    return [(cpu_agent.player, test_players, random_opening())
+            for _ in range(num_matches)]
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, pool=None):
+    """Compare the test agents to the cpu agent in "fair" matches.
+
+    "Fair" matches use random starting locations and force the agents to
+    play as both first and second player to control for advantages resulting
+    from choosing better opening moves or having first initiative to move.
+
+    The matches are played by pool if one is given, in this process
+    otherwise.
+    """
+    tasks = match_tasks(cpu_agent, test_agents, num_matches)
+    results = pool.map(play_match, tasks) if pool else map(play_match, tasks)
+    return tally(cpu_agent, test_agents, win_counts, results)
+
+
 def update(total_wins, wins):
     for player in total_wins:
         total_wins[player] += wins[player]
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, pool=None):
+    """Play matches between the test agent and each cpu_agent individually.
+
+    With a pool, the matches of every round are queued at once and the rounds
+    are reported in order as they finish.
+    """
     total_wins = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
@@ -90,6 +254,10 @@ def play_matches(cpu_agents, test_agents, num_matches):
     print("{:^9}{:^13} {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5}"
           .format("", "", *(["Won", "Lost"] * 4)))
 
+    if pool:
+        rounds = [pool.map_async(play_match, match_tasks(agent, test_agents, num_matches))
+                  for agent in cpu_agents]
+
     for idx, agent in enumerate(cpu_agents):
         wins = {test_agents[0].player: 0,
                 test_agents[1].player: 0,
@@ -99,7 +267,10 @@ def play_matches(cpu_agents, test_agents, num_matches):
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
+        if pool:
+            counts = tally(agent, test_agents, wins, rounds[idx].get())
+        else:
+            counts = play_round(agent, test_agents, wins, num_matches)
         total_timeouts += counts[0]
         total_forfeits += counts[1]
         total_wins = update(total_wins, wins)
@@ -116,6 +287,73 @@ def play_matches(cpu_agents, test_agents, num_matches):
           for a in test_agents]
     ))
 
+    print_problems(total_timeouts, total_forfeits)
+
+
+def format_elo(wins, games):
+    """Format the Elo difference of wins out of games with its interval."""
+    value, low, high = elo_interval(wins, games)
+    return "{:+.0f} [{:+.0f}, {:+.0f}]".format(value, low, high)
+
+
+def play_sequential(cpu_agents, test_agents, max_matches=MAX_MATCHES, pool=None, batch=1):
+    """Play every pairing of a test agent and a cpu agent until the SPRT
+    decides it or max_matches matches were played.
+
+    Matches are played batch at a time, by pool if one is given, with all
+    the test agents whose pairing with the cpu agent is still undecided.
+    """
+    total_wins = {agent.player: 0 for agent in test_agents}
+    total_games = {agent.player: 0 for agent in test_agents}
+    total_timeouts = 0.
+    total_forfeits = 0.
+    outcomes = {"H0": "weaker", "H1": "stronger", None: "undecided"}
+
+    print("\n{:^13}{:^13}{:^7}{:^7}{:^22}{:^11}".format(
+        "Opponent", "Agent", "Won", "Lost", "Elo [95% CI]", "Result"))
+
+    for agent in cpu_agents:
+        wins = {a.player: 0 for a in test_agents}
+        games = {a.player: 0 for a in test_agents}
+        decisions = {a.player: None for a in test_agents}
+        undecided = list(test_agents)
+        matches = 0
+        while undecided and matches < max_matches:
+            num_matches = min(batch, max_matches - matches)
+            tasks = match_tasks(agent, undecided, num_matches)
+            results = pool.map(play_match, tasks) if pool else map(play_match, tasks)
+            round_wins = {a.player: 0 for a in undecided}
+            round_wins[agent.player] = 0
+            counts = tally(agent, undecided, round_wins, results)
+            total_timeouts += counts[0]
+            total_forfeits += counts[1]
+            matches += num_matches
+            for a in undecided:
+                wins[a.player] += round_wins[a.player]
+                games[a.player] += 2 * num_matches
+                decisions[a.player] = sprt(wins[a.player], games[a.player] - wins[a.player])[1]
+            undecided = [a for a in undecided if decisions[a.player] is None]
+
+        for a in test_agents:
+            won, played = wins[a.player], games[a.player]
+            total_wins[a.player] += won
+            total_games[a.player] += played
+            print("{:^13}{:^13}{:^7}{:^7}{:^22}{:^11}".format(
+                agent.name, a.name, won, played - won, format_elo(won, played),
+                outcomes[decisions[a.player]]), flush=True)
+
+    print("-" * 73)
+    for a in test_agents:
+        won, played = total_wins[a.player], total_games[a.player]
+        print("{:^13}{:^13}{:^7}{:^7}{:^22}".format(
+            "All", a.name, won, played - won, format_elo(won, played)))
+    print()
+
+    print_problems(total_timeouts, total_forfeits)
+
+
+def print_problems(total_timeouts, total_forfeits):
+    """Warn about timeouts and forfeits during the tournament."""
     if total_timeouts:
         print(("\nThere were {} timeouts during the tournament -- make sure " +
                "your agent handles search timeout correctly, and consider " +
@@ -126,7 +364,16 @@ def play_matches(cpu_agents, test_agents, num_matches):
                "legal moves available to play.\n").format(total_forfeits))
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--processes", type=int, default=len(available_cpus()),
+                        help="processes to play matches with, 1 to play them "
+                             "in this process (default: one per CPU)")
+    parser.add_argument("--sprt", action="store_true",
+                        help="stop every pairing once a sequential test decides it")
+    parser.add_argument("--max-matches", type=int, default=MAX_MATCHES,
+                        help="matches before an --sprt pairing is left undecided")
+    args = parser.parse_args(argv)
 
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
@@ -152,7 +399,16 @@ def main():
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    pool = make_pool(args.processes) if args.processes > 1 else None
+    try:
+        if args.sprt:
+            play_sequential(cpu_agents, test_agents, args.max_matches, pool,
+                            batch=max(args.processes, 1))
+        else:
+            play_matches(cpu_agents, test_agents, NUM_MATCHES, pool)
+    finally:
+        if pool:
+            pool.terminate()
 
 
 if __name__ == "__main__":
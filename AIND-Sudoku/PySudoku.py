@@ -7,7 +7,32 @@ digits = '123456789'
 rows = 'ABCDEFGHI'
 
 
+def square_position(x, y):
+    """Top left corner of the square in column x and row y of the board image."""
+    if x in (0, 1, 2):  startX = (x * 57) + 38
+    if x in (3, 4, 5):  startX = (x * 57) + 99
+    if x in (6, 7, 8):  startX = (x * 57) + 159
+
+    if y in (0, 1, 2):  startY = (y * 57) + 35
+    if y in (3, 4, 5):  startY = (y * 57) + 100
+    if y in (6, 7, 8):  startY = (y * 57) + 165
+    return startX, startY
+
+def box_number(values, box):
+    """The digit of a solved box as an int, None while it is unsolved."""
+    string_number = values[box]
+    if len(string_number) > 1 or string_number == '' or string_number == '.':
+        return None
+    return int(string_number)
+
 def play(values_list):
+    """
+    Replay board snapshots, one frame per snapshot.
+
+    values_list can be any iterable, such as a generator, and is consumed one
+    snapshot at a time. The 81 squares are created once and every frame only
+    redraws the squares that changed since the previous one.
+    """
     pygame.init()
 
 
@@ -22,36 +47,31 @@ def play(values_list):
     # a random number to fill in here or accept user
     # input for a duplicatable puzzle.
 
+    theSquares = {}
+    for y in range(9):
+        for x in range(9):
+            startX, startY = square_position(x, y)
+            theSquares[rows[y] + digits[x]] = SudokuSquare.SudokuSquare(None, startX, startY, "N", x, y)
+
+    screen.blit(background_image, (0, 0))
+    for square in theSquares.values():
+        square.draw()
+    pygame.display.flip()
+
     for values in values_list:
         pygame.event.pump()
-        theSquares = []
-        initXLoc = 0
-        initYLoc = 0
-        startX, startY, editable, number = 0, 0, "N", 0
-        for y in range(9):
-            for x in range(9):
-                if x in (0, 1, 2):  startX = (x * 57) + 38
-                if x in (3, 4, 5):  startX = (x * 57) + 99
-                if x in (6, 7, 8):  startX = (x * 57) + 159
-
-                if y in (0, 1, 2):  startY = (y * 57) + 35
-                if y in (3, 4, 5):  startY = (y * 57) + 100
-                if y in (6, 7, 8):  startY = (y * 57) + 165
-                col = digits[x]
-                row = rows[y]
-                string_number = values[row + col]
-                if len(string_number) > 1 or string_number == '' or string_number == '.':
-                    number = None
-                else:
-                    number = int(string_number)
-                theSquares.append(SudokuSquare.SudokuSquare(number, startX, startY, editable, x, y))
-
-        screen.blit(background_image, (0, 0))
-        for num in theSquares:
-            num.draw()
-
-        pygame.display.flip()
-        pygame.display.update()
+        dirty = []
+        for box, square in theSquares.items():
+            number = box_number(values, box)
+            if number == square.number:
+                continue
+            # Restore the background under the old square before drawing the new one
+            rect = square.rect.union(square.textpos).union(square.set_number(number))
+            screen.blit(background_image, rect, rect)
+            square.draw()
+            dirty.append(rect)
+
+        pygame.display.update(dirty)
         clock.tick(5)
 
     # leave game showing until closed by user
@@ -0,0 +1,83 @@
+"""
+Solve many Sudoku puzzles at once by fanning them out over a process pool.
+
+Usage:
+    python batch.py [puzzles.txt|-] [--output solutions.txt] [--workers N] [--backend dict|trail|bitmask|dlx]
+
+Puzzles are streamed from the file (stdin by default) and the solutions are
+written one per line in input order, so dumps of any size are solved in
+constant memory.
+"""
+import argparse
+import itertools
+import multiprocessing
+import sys
+from collections import deque
+
+import solution
+from sudoku_io import read_grids, write_solutions
+
+
+def _init_worker():
+    """Make sure no recorder inherited from the parent traces a worker."""
+    solution.active_recorder = None
+
+def _solve_chunk(grids, backend):
+    return [solution.solve(grid, backend) for grid in grids]
+
+def solve_many(grids, workers=None, chunksize=64, backend='dict'):
+    """
+    Solve a stream of puzzles on a pool of worker processes.
+
+    Puzzles are read lazily and at most two chunks per worker are in flight,
+    so memory use does not grow with the number of puzzles.
+    Args:
+        grids: an iterable of grid strings, which are solved as they are, or
+            the name of a file, '-' or None for stdin, or an open file, which
+            are read with sudoku_io.read_grids().
+        workers(int): number of worker processes, defaults to the number of CPUs.
+        chunksize(int): number of puzzles handed to a worker at a time.
+        backend(string): the solution.solve() backend to use.
+    Yields:
+        The result of solution.solve() for every puzzle, in input order. A
+        grid string solve() cannot parse raises or gives False, like solve().
+    """
+    workers = workers or multiprocessing.cpu_count()
+    if grids is None or isinstance(grids, str) or hasattr(grids, 'read'):
+        grids = read_grids(grids)
+    grids = iter(grids)
+    chunks = iter(lambda: list(itertools.islice(grids, chunksize)), [])
+
+    pool = multiprocessing.Pool(workers, initializer=_init_worker)
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_solve_chunk, (chunk, backend)))
+            # Wait for the oldest chunk before reading further ahead
+            if len(pending) >= 2 * workers:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of Sudoku puzzles on a process pool.")
+    parser.add_argument('input', nargs='?', default='-', help="puzzle file, '-' for stdin (default)")
+    parser.add_argument('--output', default='-', help="solution file, '-' for stdout (default)")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--chunksize', type=int, default=64)
+    parser.add_argument('--backend', default='dict', choices=('dict', 'trail', 'bitmask', 'dlx'))
+    args = parser.parse_args(argv)
+
+    # The copy of the puzzles only holds the ones in flight
+    puzzles, grids = itertools.tee(read_grids(args.input))
+    results = solve_many(grids, args.workers, args.chunksize, args.backend)
+    unsolved = write_solutions(puzzles, results, args.output)
+    if unsolved:
+        print("{} puzzles have no solution".format(unsolved), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark the Sudoku engines on the bundled puzzle corpora.
+
+Every puzzle is solved twice: once plainly to measure latency, and once with
+a StrategyStats attached to count search nodes and backtracks and to split
+the time between eliminate, only choice, the extra strategies (naked_pairs is
+the naked twins strategy) and branching. Only the bitmask engine records
+these counters; the reports of the other backends have latencies only, and
+say so in place of the phases. The report is printed as JSON so it can be
+stored and compared across versions.
+
+Usage:
+    python benchmark.py [corpus ...] [--backend bitmask|dlx|dict|trail] [--strategies naked_pairs,x_wing|all|none] [--output report.json]
+
+A corpus is the name of a bundled set in puzzles/ (easy, hard, 17clue, which
+are standard Sudoku, and diagonal) or the path of a file with one puzzle per
+line. The dict and trail engines of solution.py only solve diagonal Sudoku,
+so they need --diagonal, which benchmarks the diagonal corpus by default.
+Every puzzle of a corpus has to be solved, so that failed runs are never
+timed as if they were solves.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import bitmask
+import dlx
+import solution
+import strategies
+from geometry import get_geometry
+from sudoku_io import read_grids
+
+PUZZLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzles')
+CORPORA = ('easy', 'hard', '17clue')
+DIAGONAL_CORPORA = ('diagonal',)
+BACKENDS = ('bitmask', 'dlx', 'dict', 'trail')
+
+
+def corpus_path(corpus):
+    """Return the file of a bundled corpus name, or corpus itself if it is a path."""
+    if os.path.exists(corpus):
+        return corpus
+    return os.path.join(PUZZLE_DIR, corpus + '.txt')
+
+def percentiles(samples, points=(50, 90, 99)):
+    """Nearest-rank percentiles of samples, as {'p50': ..., ...}."""
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        rank = max(0, -(-p * len(ordered) // 100) - 1)
+        result['p{}'.format(p)] = ordered[rank]
+    return result
+
+def run_corpus(grids, geometry, backend='bitmask', steps=()):
+    """
+    Solve every grid and collect latency, search and phase statistics.
+    Args:
+        grids(list): the puzzles to solve
+        geometry(SudokuGeometry): the board of the puzzles
+        backend(string): 'bitmask', 'dlx', or 'dict' or 'trail' for the
+            solution.solve() engines, which only solve the diagonal board
+        steps(tuple): extra strategies for the bitmask engine
+    Returns:
+        A dict that can be dumped as JSON, with only the puzzle and solved
+        counts for an empty corpus.
+    """
+    if backend == 'bitmask':
+        solve = lambda grid: bitmask.solve(grid, geometry, steps)
+    elif backend == 'dlx':
+        solve = lambda grid: dlx.solve(grid, geometry)
+    elif backend in ('dict', 'trail'):
+        if geometry != get_geometry(3, diagonal=True):
+            raise ValueError("The {} backend only solves diagonal 9x9 Sudoku".format(backend))
+        solve = lambda grid: solution.solve(grid, backend)
+    else:
+        raise ValueError("Unknown backend: {}".format(backend))
+
+    if not grids:
+        return {'puzzles': 0, 'solved': 0}
+
+    latencies = []
+    solved = 0
+    for grid in grids:
+        start = time.perf_counter()
+        solved += bool(solve(grid))
+        latencies.append(1000 * (time.perf_counter() - start))
+
+    report = {
+        'puzzles': len(grids),
+        'solved': solved,
+        'latency_ms': dict(percentiles(latencies), mean=sum(latencies) / len(latencies),
+                           max=max(latencies), total=sum(latencies)),
+    }
+
+    # Only the bitmask engine counts its propagation phases
+    if backend == 'bitmask':
+        stats = strategies.StrategyStats()
+        nodes = []
+        backtracks = []
+        for grid in grids:
+            before = stats.nodes, stats.backtracks
+            bitmask.solve(grid, geometry, steps, stats)
+            nodes.append(stats.nodes - before[0])
+            backtracks.append(stats.backtracks - before[1])
+        report['nodes'] = {'total': sum(nodes), 'mean': sum(nodes) / len(nodes), 'max': max(nodes)}
+        report['backtracks'] = {'total': sum(backtracks), 'mean': sum(backtracks) / len(backtracks),
+                                'max': max(backtracks)}
+        report['phases'] = stats.report()
+    else:
+        report['phases'] = "not recorded by the {} backend, only by bitmask".format(backend)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku engines.")
+    parser.add_argument('corpora', nargs='*',
+                        help="bundled corpus names or puzzle files (default: the bundled "
+                             "standard corpora, or the diagonal one with --diagonal)")
+    parser.add_argument('--backend', default='bitmask', choices=BACKENDS)
+    parser.add_argument('--strategies', default='naked_pairs',
+                        help="comma separated strategies from strategies.py, 'all' or 'none'")
+    parser.add_argument('--diagonal', action='store_true',
+                        help="add the diagonal units (only the bundled diagonal corpus is diagonal Sudoku)")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if args.backend in ('dict', 'trail') and not args.diagonal:
+        parser.error("the {} backend only solves diagonal Sudoku, add --diagonal".format(args.backend))
+
+    geometry = get_geometry(3, diagonal=args.diagonal)
+    steps = strategies.pipeline(args.strategies)
+    report = {
+        'backend': args.backend,
+        'strategies': [step.__name__ for step in steps],
+        'diagonal': args.diagonal,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'corpora': {},
+    }
+    for corpus in args.corpora or (DIAGONAL_CORPORA if args.diagonal else CORPORA):
+        grids = list(read_grids(corpus_path(corpus), geometry))
+        result = run_corpus(grids, geometry, args.backend, steps)
+        if result['solved'] < result['puzzles']:
+            raise SystemExit("{}: only {} of {} puzzles solved, is it {}diagonal Sudoku?".format(
+                corpus, result['solved'], result['puzzles'], '' if args.diagonal else 'non-'))
+        report['corpora'][corpus] = result
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Bitmask-backed board engine for the Sudoku solver.
+
+The candidates of every box are kept as an integer mask (bit d-1 is set while
+the d-th digit is still possible) in a flat list with one slot per box, in
+board order. Peers and units come from a SudokuGeometry as tuples of indexes,
+so the strategies only do integer arithmetic and strings are only built again
+when the answer is handed back in the usual {'A1': '8', ...} dict format.
+
+Every function takes the geometry of the board, the diagonal 9x9 board of
+the project by default.
+"""
+from time import perf_counter
+
+from geometry import DIAGONAL
+
+# Tables of the diagonal 9x9 board, kept for callers of the original engine
+digits = DIAGONAL.digits
+ALL = DIAGONAL.all
+INDEX = DIAGONAL.index
+UNITS = DIAGONAL.unit_list
+BOX_UNITS = DIAGONAL.units
+PEERS = DIAGONAL.peers
+DIGIT_BIT = DIAGONAL.digit_bit
+BIT_COUNT = DIAGONAL.bit_count
+MASK_DIGITS = DIAGONAL.mask_digits
+
+
+def values_masks(values, geometry=DIAGONAL):
+    """
+    Convert a values dict into a flat list of candidate masks.
+    Args:
+        values(dict): a dictionary of the form {'box_name': '123456789', ...}
+        geometry(SudokuGeometry): the board the values belong to
+    Returns:
+        A list of candidate masks in board order.
+    """
+    return geometry.values_masks(values)
+
+def masks_values(masks, geometry=DIAGONAL):
+    """
+    Convert a flat list of candidate masks back into a values dict.
+    Args:
+        masks(list): candidate masks in board order.
+        geometry(SudokuGeometry): the board the masks belong to
+    Returns:
+        A dictionary of the form {'box_name': '123456789', ...}
+    """
+    return geometry.masks_values(masks)
+
+def grid_masks(grid, geometry=DIAGONAL):
+    """
+    Convert grid string into a flat list of candidate masks, all digits for empties.
+    Args:
+        grid(string) - A grid in string form.
+        geometry(SudokuGeometry): the board the grid belongs to
+    Returns:
+        A list of candidate masks in board order.
+    """
+    return geometry.grid_masks(grid)
+
+def eliminate(masks, geometry=DIAGONAL):
+    """Remove the digit of every solved box from the candidates of its peers."""
+    bit_count, peers = geometry.bit_count, geometry.peers
+    for i, m in enumerate(masks):
+        if bit_count[m] == 1:
+            for p in peers[i]:
+                masks[p] &= ~m
+    return masks
+
+def only_choice(masks, geometry=DIAGONAL):
+    """Finalize all digits that only fit in a single box of a unit."""
+    for unit in geometry.unit_list:
+        # Digits seen at least once and at least twice in this unit
+        once = twice = 0
+        for i in unit:
+            twice |= once & masks[i]
+            once |= masks[i]
+        singles = once & ~twice
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
+            for i in unit:
+                if masks[i] & bit:
+                    masks[i] = bit
+                    break
+    return masks
+
+def naked_twins(masks, geometry=DIAGONAL):
+    """Eliminate the digits of naked twins from the other boxes of their unit."""
+    bit_count = geometry.bit_count
+    for unit in geometry.unit_list:
+        # Cache the first box seen for every two-candidate mask
+        c = {}
+        for i in unit:
+            m = masks[i]
+            if bit_count[m] == 2:
+                if m in c:
+                    for p in unit:
+                        if p != i and p != c[m]:
+                            masks[p] &= ~m
+                else:
+                    c[m] = i
+    return masks
+
+def reduce_puzzle(masks, geometry=DIAGONAL, strategies=(), stats=None, trace=None, depth=0):
+    """
+    Propagate eliminate() and only_choice() until nothing changes, driven by
+    work queues so that only the peers of newly solved boxes and the units of
+    changed boxes are revisited. When they stall, the extra strategies (see
+    strategies.py) are tried in order and propagation resumes from the boxes
+    the first one that fires changed. Returns False if some box runs out of
+    candidates or some digit runs out of places in a unit.
+    Args:
+        masks(list): candidate masks in board order, reduced in place
+        geometry(SudokuGeometry): the board the masks belong to
+        strategies(tuple): extra strategies to run, none by default
+        stats(StrategyStats): counts calls and time of every step if given
+        trace(callable): called as trace(box, before, after, strategy, depth)
+            for every change of a mask if given, see sudoku_trace.py
+        depth(int): the search depth reported to trace
+    """
+    bit_count, peers = geometry.bit_count, geometry.peers
+    unit_list, units = geometry.unit_list, geometry.units
+    full = geometry.all
+
+    solved = [i for i, m in enumerate(masks) if bit_count[m] == 1]
+    dirty = set(range(len(unit_list)))
+
+    while True:
+        while solved or dirty:
+            if solved:
+                if stats is not None:
+                    start, fired = perf_counter(), False
+                while solved:
+                    i = solved.pop()
+                    m = masks[i]
+                    for p in peers[i]:
+                        pm = masks[p]
+                        if pm & m:
+                            if trace is not None:
+                                trace(p, pm, pm & ~m, 'eliminate', depth)
+                            pm &= ~m
+                            masks[p] = pm
+                            if not pm:
+                                return False
+                            if bit_count[pm] == 1:
+                                solved.append(p)
+                            dirty.update(units[p])
+                            fired = True
+                if stats is not None:
+                    stats.add('eliminate', fired, perf_counter() - start)
+            if dirty:
+                if stats is not None:
+                    start, fired = perf_counter(), False
+                unit = unit_list[dirty.pop()]
+                once = twice = 0
+                for i in unit:
+                    twice |= once & masks[i]
+                    once |= masks[i]
+                # A digit with no place left in the unit is a contradiction
+                if once != full:
+                    return False
+                singles = once & ~twice
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
+                    for i in unit:
+                        if masks[i] & bit:
+                            if masks[i] != bit:
+                                if trace is not None:
+                                    trace(i, masks[i], bit, 'only_choice', depth)
+                                masks[i] = bit
+                                solved.append(i)
+                                dirty.update(units[i])
+                                fired = True
+                            break
+                if stats is not None:
+                    stats.add('only_choice', fired, perf_counter() - start)
+
+        # Singles are exhausted, resume from the first strategy that fires
+        for strategy in strategies:
+            if trace is not None:
+                before = masks[:]
+            changed = stats.run(strategy, masks, geometry) if stats is not None else strategy(masks, geometry)
+            if changed:
+                break
+        else:
+            return masks
+        if trace is not None:
+            for i in sorted(set(changed)):
+                trace(i, before[i], masks[i], strategy.__name__, depth)
+        for i in changed:
+            m = masks[i]
+            if not m:
+                return False
+            if bit_count[m] == 1:
+                solved.append(i)
+            dirty.update(units[i])
+
+def iter_solutions(masks, geometry=DIAGONAL, strategies=(), stats=None, trace=None, depth=0):
+    """
+    Depth-first search and propagation that keeps going after the first solution.
+    Args:
+        masks(list): candidate masks in board order, reduced in place
+        geometry(SudokuGeometry): the board the masks belong to
+        strategies(tuple): extra strategies for reduce_puzzle()
+        stats(StrategyStats): collects search and per strategy statistics if given
+        trace(callable): receives every change of a mask if given, see reduce_puzzle()
+        depth(int): the search depth of masks
+    Yields:
+        The candidate masks of every solution, in the order search() finds them.
+    """
+    if stats is not None:
+        stats.nodes += 1
+    if reduce_puzzle(masks, geometry, strategies, stats, trace, depth) is False:
+        return
+
+    # Choose one of the unfilled boxes with the fewest possibilities
+    if stats is not None:
+        start = perf_counter()
+    bit_count = geometry.bit_count
+    unsolved = [(bit_count[m], i) for i, m in enumerate(masks) if bit_count[m] > 1]
+    if not unsolved:
+        yield masks
+        return
+    n, min_i = min(unsolved)
+    if stats is not None:
+        stats.add('branching', True, perf_counter() - start)
+
+    candidates = masks[min_i]
+    while candidates:
+        bit = candidates & -candidates
+        candidates ^= bit
+        attempt = masks[:]
+        attempt[min_i] = bit
+        if trace is not None:
+            trace(min_i, masks[min_i], bit, 'search', depth + 1)
+        found = False
+        for solution in iter_solutions(attempt, geometry, strategies, stats, trace, depth + 1):
+            found = True
+            yield solution
+        if not found:
+            if stats is not None:
+                stats.backtracks += 1
+            if trace is not None:
+                trace(min_i, bit, masks[min_i], 'backtrack', depth)
+
+def search(masks, geometry=DIAGONAL, strategies=(), stats=None, trace=None):
+    "Using depth-first search and propagation, solve the board of candidate masks."
+    for solution in iter_solutions(masks, geometry, strategies, stats, trace):
+        return solution
+    return False
+
+def count_solutions(grid, limit=2, geometry=DIAGONAL, strategies=()):
+    """
+    Count the solutions of a Sudoku grid, stopping as soon as limit is reached.
+    With the default limit of 2 this tells whether the solution is unique.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): stop counting at this many solutions, None to count them all
+        geometry(SudokuGeometry): the board the grid belongs to
+        strategies(tuple): extra strategies for reduce_puzzle()
+    Returns:
+        The number of solutions, at most limit.
+    """
+    count = 0
+    for _ in iter_solutions(grid_masks(grid, geometry), geometry, strategies):
+        count += 1
+        if count == limit:
+            break
+    return count
+
+def solve(grid, geometry=DIAGONAL, strategies=(), stats=None):
+    """
+    Find the solution to a Sudoku grid using the bitmask engine.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        geometry(SudokuGeometry): the board the grid belongs to
+        strategies(tuple): extra strategies for reduce_puzzle(), e.g. strategies.PIPELINE
+        stats(StrategyStats): collects search and per strategy statistics if given
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    masks = search(grid_masks(grid, geometry), geometry, strategies, stats)
+    if masks is False:
+        return False
+    return masks_values(masks, geometry)
@@ -0,0 +1,251 @@
+"""
+Exact cover (Dancing Links) engine for the Sudoku solver.
+
+The units of a SudokuGeometry (the diagonal 9x9 board of the project by
+default) are compiled into an exact cover matrix: one column per box ("the
+box holds a digit") plus one column per unit and digit ("the digit appears
+once in the unit"), and one row per (box, digit) choice. The matrix is solved
+with Knuth's Algorithm X on dancing links, which backtracks on the column with
+the fewest remaining rows and has no propagation rules that can go
+exponential on adversarial puzzles.
+"""
+from geometry import DIAGONAL, BLANKS
+
+
+class DancingLinks(object):
+    """
+    Sparse 0/1 matrix stored as toroidal doubly linked lists in flat arrays.
+
+    Node 0 is the root and nodes 1..n are the column headers, the remaining
+    nodes are the 1s of the matrix. L/R link a node to its row neighbours,
+    U/D to its column neighbours, C holds the header of a node's column,
+    ROW the matrix row of a node and S the number of 1s left in a column.
+    """
+
+    def __init__(self, n_columns, rows):
+        """
+        Args:
+            n_columns(int): number of columns of the matrix
+            rows(list): for every row, the list of column indexes holding a 1
+        """
+        n = n_columns
+        self.L = [n] + list(range(n))
+        self.R = list(range(1, n + 1)) + [0]
+        self.U = list(range(n + 1))
+        self.D = list(range(n + 1))
+        self.C = list(range(n + 1))
+        self.ROW = [-1] * (n + 1)
+        self.S = [0] * (n + 1)
+        # First node of every row, to find the columns a row covers
+        self.row_nodes = []
+
+        L, R, U, D, C = self.L, self.R, self.U, self.D, self.C
+        for r, columns in enumerate(rows):
+            first = None
+            for c in columns:
+                c += 1
+                x = len(C)
+                C.append(c)
+                self.ROW.append(r)
+                U.append(U[c])
+                D.append(c)
+                D[U[c]] = x
+                U[c] = x
+                self.S[c] += 1
+                if first is None:
+                    first = x
+                    L.append(x)
+                    R.append(x)
+                else:
+                    L.append(L[first])
+                    R.append(first)
+                    R[L[first]] = x
+                    L[first] = x
+            self.row_nodes.append(first)
+
+    def copy(self):
+        """Return an independent copy of the matrix."""
+        new = DancingLinks.__new__(DancingLinks)
+        for name in ('L', 'R', 'U', 'D', 'C', 'ROW', 'S', 'row_nodes'):
+            setattr(new, name, list(getattr(self, name)))
+        return new
+
+    def cover(self, c):
+        """Remove column c and every row with a 1 in it from the matrix."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        """Undo cover(c); calls must be made in the reverse order of cover()."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def select(self, r):
+        """
+        Force row r into the solution by covering all of its columns.
+        Returns False, leaving the matrix untouched, if one of them is already covered.
+        """
+        x = self.row_nodes[r]
+        columns = [x]
+        j = self.R[x]
+        while j != x:
+            columns.append(j)
+            j = self.R[j]
+        columns = [self.C[j] for j in columns]
+        for c in columns:
+            # A covered header has been unlinked from the header list
+            if self.R[self.L[c]] != c:
+                return False
+        for c in columns:
+            self.cover(c)
+        return True
+
+    def solutions(self, partial=None):
+        """
+        Algorithm X.
+        Yields:
+            The list of rows of every exact cover of the remaining columns,
+            appended to partial.
+        """
+        if partial is None:
+            partial = []
+        R, D, C, S = self.R, self.D, self.C, self.S
+        if R[0] == 0:
+            yield list(partial)
+            return
+
+        # Choose the column with the fewest rows left
+        c = R[0]
+        j = R[c]
+        while j != 0:
+            if S[j] < S[c]:
+                c = j
+            j = R[j]
+        if S[c] == 0:
+            return
+
+        self.cover(c)
+        i = D[c]
+        while i != c:
+            partial.append(self.ROW[i])
+            j = R[i]
+            while j != i:
+                self.cover(C[j])
+                j = R[j]
+            for rows in self.solutions(partial):
+                yield rows
+            j = self.L[i]
+            while j != i:
+                self.uncover(C[j])
+                j = self.L[j]
+            partial.pop()
+            i = D[i]
+        self.uncover(c)
+
+
+def sudoku_rows(geometry=DIAGONAL):
+    """
+    Compile the units of a board into exact cover rows.
+    Args:
+        geometry(SudokuGeometry): the board to compile
+    Returns:
+        The number of columns and, for every (box, digit) choice in the
+        order boxes x digits, the list of columns it covers.
+    """
+    cells, size = geometry.cells, geometry.size
+    n_columns = cells + len(geometry.unit_list) * size
+    rows = []
+    for b in range(cells):
+        for d in range(size):
+            rows.append([b] + [cells + u * size + d for u in geometry.units[b]])
+    return n_columns, rows
+
+# Matrices are built once per geometry and copied for every puzzle
+_matrices = {}
+
+def sudoku_matrix(geometry=DIAGONAL):
+    """Return a fresh exact cover matrix for the board."""
+    if geometry not in _matrices:
+        _matrices[geometry] = DancingLinks(*sudoku_rows(geometry))
+    return _matrices[geometry].copy()
+
+
+def _select_givens(grid, geometry):
+    """
+    Build a matrix for the board and select the rows of the givens of grid.
+    Returns:
+        The matrix and the list of selected rows, or None if the givens conflict.
+    """
+    size, digits = geometry.size, geometry.digits
+    if len(grid) != geometry.cells:
+        raise ValueError("Expected a grid of {} boxes, got {}".format(geometry.cells, len(grid)))
+
+    matrix = sudoku_matrix(geometry)
+    givens = []
+    for b, char in enumerate(grid):
+        if char in BLANKS and char not in digits:
+            continue
+        r = b * size + digits.index(char)
+        if not matrix.select(r):
+            return None
+        givens.append(r)
+    return matrix, givens
+
+def solve(grid, geometry=DIAGONAL):
+    """
+    Find the solution to a Sudoku grid using Dancing Links.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        geometry(SudokuGeometry): the board the grid belongs to
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    selected = _select_givens(grid, geometry)
+    if selected is None:
+        return False
+    matrix, givens = selected
+    size, digits = geometry.size, geometry.digits
+    for rows in matrix.solutions(givens):
+        return {geometry.boxes[r // size]: digits[r % size] for r in rows}
+    return False
+
+def count_solutions(grid, limit=2, geometry=DIAGONAL):
+    """
+    Count the exact covers of a Sudoku grid, stopping as soon as limit is reached.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): stop counting at this many solutions, None to count them all
+        geometry(SudokuGeometry): the board the grid belongs to
+    Returns:
+        The number of solutions, at most limit.
+    """
+    selected = _select_givens(grid, geometry)
+    if selected is None:
+        return 0
+    matrix, givens = selected
+    count = 0
+    for _ in matrix.solutions(givens):
+        count += 1
+        if count == limit:
+            break
+    return count
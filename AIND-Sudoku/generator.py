@@ -0,0 +1,186 @@
+"""
+Generate Sudoku puzzles with a unique solution and grade their difficulty.
+
+A puzzle starts as a random full grid and clues are removed in random order.
+Instead of counting solutions after every removal, the generator keeps the
+solution it started from: removing the clue v of box c keeps the solution
+unique exactly when no grid satisfies the other clues with c != v, which is a
+single refutation search that propagation usually settles without branching.
+A clue that cannot be removed can never be removed later either (fewer clues
+only allow more solutions), so every box is tried once. The candidate masks
+implied by the clues are updated incrementally as clues go, rather than
+rebuilt from the grid string for every test.
+
+Usage:
+    python generator.py [--count N] [--difficulty easy|medium|hard|expert] [--standard] [--seed S]
+"""
+import argparse
+import random
+
+import bitmask
+import strategies
+from geometry import DIAGONAL, get_geometry
+
+# Difficulty levels, by the hardest step needed to solve a puzzle
+DIFFICULTIES = ('easy', 'medium', 'hard', 'expert')
+LEVELS = {
+    'eliminate': 'easy',
+    'only_choice': 'easy',
+    'naked_pairs': 'medium',
+    'pointing_pairs': 'medium',
+    'box_line_reduction': 'medium',
+    'hidden_pairs': 'medium',
+    'naked_triples': 'hard',
+    'hidden_triples': 'hard',
+    'x_wing': 'hard',
+}
+
+
+def random_solution(geometry=DIAGONAL, rnd=random):
+    """
+    Fill an empty board with a random valid grid.
+    Returns:
+        The candidate masks of the grid, one bit each.
+    """
+    def fill(masks):
+        if bitmask.reduce_puzzle(masks, geometry) is False:
+            return False
+        unsolved = [(geometry.bit_count[m], rnd.random(), i) for i, m in enumerate(masks)
+                    if geometry.bit_count[m] > 1]
+        if not unsolved:
+            return masks
+        _, _, i = min(unsolved)
+        bits = [1 << d for d in range(geometry.size) if masks[i] >> d & 1]
+        rnd.shuffle(bits)
+        for bit in bits:
+            attempt = masks[:]
+            attempt[i] = bit
+            attempt = fill(attempt)
+            if attempt:
+                return attempt
+        return False
+
+    return fill([geometry.all] * geometry.cells)
+
+def grade(grid, geometry=DIAGONAL):
+    """
+    Grade a puzzle by the strategies needed to solve it.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        geometry(SudokuGeometry): the board the grid belongs to
+    Returns:
+        The difficulty, one of DIFFICULTIES, and the names of the strategies
+        that fired. 'expert' puzzles cannot be solved without search.
+    """
+    stats = strategies.StrategyStats()
+    masks = bitmask.reduce_puzzle(geometry.grid_masks(grid), geometry, strategies.PIPELINE, stats)
+    used = sorted(name for name, fired in stats.fired.items() if fired)
+    if masks is False or any(geometry.bit_count[m] != 1 for m in masks):
+        return 'expert', used
+    level = max([DIFFICULTIES.index(LEVELS[name]) for name in used] or [0])
+    return DIFFICULTIES[level], used
+
+
+class _Clues(object):
+    """
+    The clues of a puzzle being generated and the candidate masks they imply
+    by elimination alone, kept up to date as clues are removed.
+    """
+
+    def __init__(self, solution, geometry):
+        self.geometry = geometry
+        self.solution = solution
+        self.given = [True] * geometry.cells
+        self.masks = solution[:]
+
+    def _implied(self, i):
+        """Candidates of box i given the clues of its peers."""
+        m = self.geometry.all
+        for p in self.geometry.peers[i]:
+            if self.given[p]:
+                m &= ~self.solution[p]
+        return m
+
+    def remove(self, i):
+        """Remove the clue of box i and update the masks of its peers."""
+        self.given[i] = False
+        self.masks[i] = self._implied(i)
+        for p in self.geometry.peers[i]:
+            if not self.given[p]:
+                self.masks[p] = self._implied(p)
+
+    def restore(self, i):
+        """Put the clue of box i back."""
+        self.given[i] = True
+        self.masks[i] = self.solution[i]
+        for p in self.geometry.peers[i]:
+            if not self.given[p]:
+                self.masks[p] = self._implied(p)
+
+    def try_remove(self, i):
+        """
+        Remove the clue of box i if the solution stays unique without it.
+        Returns:
+            Whether the clue was removed.
+        """
+        self.remove(i)
+        masks = self.masks[:]
+        masks[i] &= ~self.solution[i]
+        if masks[i] and bitmask.search(masks, self.geometry) is not False:
+            self.restore(i)
+            return False
+        return True
+
+    def grid(self):
+        """The puzzle as a grid string."""
+        g = self.geometry
+        return ''.join(g.mask_digits[m] if given else '.'
+                       for m, given in zip(self.solution, self.given))
+
+
+def generate(geometry=DIAGONAL, difficulty=None, rnd=random, max_attempts=100):
+    """
+    Generate a puzzle with a unique solution.
+    Args:
+        geometry(SudokuGeometry): the board to generate for
+        difficulty(string): one of DIFFICULTIES, or None for any. Clues whose
+            removal would make the puzzle harder are kept.
+        rnd(random.Random): source of randomness
+        max_attempts(int): full grids to try before giving up on the difficulty
+    Returns:
+        The puzzle as a grid string and its difficulty.
+    """
+    for _ in range(max_attempts):
+        clues = _Clues(random_solution(geometry, rnd), geometry)
+        order = list(range(geometry.cells))
+        rnd.shuffle(order)
+        for i in order:
+            if not clues.try_remove(i):
+                continue
+            if difficulty is not None and \
+                    DIFFICULTIES.index(grade(clues.grid(), geometry)[0]) > DIFFICULTIES.index(difficulty):
+                clues.restore(i)
+
+        grid = clues.grid()
+        level = grade(grid, geometry)[0]
+        if difficulty is None or level == difficulty:
+            return grid, level
+    raise RuntimeError("No {} puzzle found in {} attempts".format(difficulty, max_attempts))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles with a unique solution.")
+    parser.add_argument('--count', type=int, default=1)
+    parser.add_argument('--difficulty', choices=DIFFICULTIES)
+    parser.add_argument('--standard', action='store_true', help="without the diagonal units")
+    parser.add_argument('--size', type=int, default=3, help="side of a square, 3 for 9x9 boards")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    geometry = get_geometry(args.size, diagonal=not args.standard)
+    rnd = random.Random(args.seed)
+    for _ in range(args.count):
+        grid, level = generate(geometry, args.difficulty, rnd)
+        print(grid)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Precomputed board tables for n^2 x n^2 Sudoku boards (4x4, 9x9, 16x16, 25x25).
+
+The bitmask and Dancing Links engines take a SudokuGeometry instead of the
+hard-wired 9x9 tables in solution.py. Boxes are addressed by their index in
+a flat board, row by row, and candidates are masks with one bit per digit.
+"""
+
+# Alphabets used for the digits and row names of larger boards
+DIGITS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+ROWS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Characters standing for an empty box in a grid string
+BLANKS = '.0'
+
+
+class _BitCount(object):
+    """Stand-in for a bit count table when a full table would be too large."""
+
+    def __getitem__(self, m):
+        return bin(m).count('1')
+
+
+class _MaskDigits(object):
+    """Stand-in for a mask to digits table when a full table would be too large."""
+
+    def __init__(self, digits):
+        self.digits = digits
+
+    def __getitem__(self, m):
+        return ''.join(d for i, d in enumerate(self.digits) if m >> i & 1)
+
+
+class SudokuGeometry(object):
+    """
+    Unit and peer tables of an n^2 x n^2 board with n x n squares.
+
+    Attributes:
+        n(int): side of a square, 3 for the classic board
+        size(int): number of rows, columns and digits (n * n)
+        digits(string): the candidate alphabet, one character per digit
+        boxes(list): box names such as 'A1', in board order
+        index(dict): the board index of every box name
+        unit_list(tuple): every unit as a tuple of board indexes
+        row_units, col_units, square_units, diagonal_units(tuple): slices of unit_list
+        units(tuple): for every box, the indexes into unit_list of its units
+        peers(tuple): for every box, the sorted tuple of its peers
+        all(int): the candidate mask with every digit possible
+        digit_bit(dict): the candidate bit of every digit character
+        bit_count: bit_count[mask] is the number of candidates in mask
+        mask_digits: mask_digits[mask] is the string of candidates in mask
+    """
+
+    def __init__(self, n=3, diagonal=True, digits=None):
+        """
+        Args:
+            n(int): side of a square, the board has n^2 rows and columns
+            diagonal(bool): whether the two main diagonals are units too
+            digits(string): candidate alphabet, defaults to the first n^2 of 1-9A-Z
+        """
+        size = n * n
+        if digits is None:
+            digits = DIGITS[:size]
+        if len(digits) != size or size > len(ROWS):
+            raise ValueError("A {0}x{0} board needs {0} distinct digits".format(size))
+
+        self.n = n
+        self.size = size
+        self.cells = size * size
+        self.diagonal = diagonal
+        self.digits = digits
+        self.boxes = [r + str(c + 1) for r in ROWS[:size] for c in range(size)]
+        self.index = {box: i for i, box in enumerate(self.boxes)}
+
+        rows = [[r * size + c for c in range(size)] for r in range(size)]
+        cols = [[r * size + c for r in range(size)] for c in range(size)]
+        squares = [[(sr + r) * size + sc + c for r in range(n) for c in range(n)]
+                   for sr in range(0, size, n) for sc in range(0, size, n)]
+        unit_list = rows + cols + squares
+        if diagonal:
+            unit_list += [[i * size + i for i in range(size)],
+                          [i * size + size - 1 - i for i in range(size)]]
+        self.unit_list = tuple(tuple(unit) for unit in unit_list)
+        self.row_units = self.unit_list[:size]
+        self.col_units = self.unit_list[size:2 * size]
+        self.square_units = self.unit_list[2 * size:3 * size]
+        self.diagonal_units = self.unit_list[3 * size:]
+
+        self.units = tuple(tuple(u for u, unit in enumerate(self.unit_list) if i in unit)
+                           for i in range(self.cells))
+        self.peers = tuple(tuple(sorted(set(p for u in self.units[i] for p in self.unit_list[u]) - {i}))
+                           for i in range(self.cells))
+
+        self.all = (1 << size) - 1
+        self.digit_bit = {d: 1 << i for i, d in enumerate(digits)}
+        # Lookup tables for small boards, computed on the fly for larger ones
+        self.bit_count = tuple(bin(m).count('1') for m in range(self.all + 1)) \
+            if size <= 16 else _BitCount()
+        self.mask_digits = tuple(_MaskDigits(digits)[m] for m in range(self.all + 1)) \
+            if size <= 9 else _MaskDigits(digits)
+
+    def grid_masks(self, grid):
+        """
+        Convert grid string into a flat list of candidate masks, all for empties.
+        Args:
+            grid(string): the boxes row by row, '.' (or '0' if it is not a digit) for empties
+        Returns:
+            A list of candidate masks in board order.
+        """
+        if len(grid) != self.cells:
+            raise ValueError("Expected a grid of {} boxes, got {}".format(self.cells, len(grid)))
+        masks = []
+        for char in grid:
+            if char in self.digit_bit:
+                masks.append(self.digit_bit[char])
+            elif char in BLANKS:
+                masks.append(self.all)
+            else:
+                raise ValueError("Unexpected character {!r} in grid".format(char))
+        return masks
+
+    def values_masks(self, values):
+        """Convert a values dict into a flat list of candidate masks."""
+        masks = []
+        for box in self.boxes:
+            m = 0
+            for d in values[box]:
+                m |= self.digit_bit[d]
+            masks.append(m)
+        return masks
+
+    def masks_values(self, masks):
+        """Convert a flat list of candidate masks back into a values dict."""
+        mask_digits = self.mask_digits
+        return {box: mask_digits[m] for box, m in zip(self.boxes, masks)}
+
+    def masks_grid(self, masks):
+        """Convert a flat list of candidate masks into a grid string, '.' for unsolved boxes."""
+        bit_count, mask_digits = self.bit_count, self.mask_digits
+        return ''.join(mask_digits[m] if bit_count[m] == 1 else '.' for m in masks)
+
+
+_geometries = {}
+
+def get_geometry(n=3, diagonal=True):
+    """Return the shared SudokuGeometry for a board, building it on first use."""
+    key = (n, diagonal)
+    if key not in _geometries:
+        _geometries[key] = SudokuGeometry(n, diagonal)
+    return _geometries[key]
+
+# The diagonal 9x9 board of the project
+DIAGONAL = get_geometry(3, diagonal=True)
@@ -44,17 +44,12 @@ def AAfilledRoundedRect(surface,rect,color,radius=0.4):
 class SudokuSquare:
     """A sudoku square class."""
     def __init__(self, number=None, offsetX=0, offsetY=0, edit="Y", xLoc=0, yLoc=0):
-        if number != None:
-            number = str(number)
-            self.color = (2, 204, 186)
-        else:
-            number = ""
-            self.color = (255, 255, 255)
         # print("FONTS", pygame.font.get_fonts())
         self.font = pygame.font.SysFont('opensans', 21)
-        self.text = self.font.render(number, 1, (255, 255, 255))
-        self.textpos = self.text.get_rect()
-        self.textpos = self.textpos.move(offsetX + 17, offsetY + 4)
+        self.rect = Rect(offsetX, offsetY, 45, 40)
+        self.offsetX = offsetX
+        self.offsetY = offsetY
+        self.set_number(number)
 
         # self.collide = pygame.Surface((25, 22))
         # self.collide = self.collide.convert()
@@ -67,15 +62,31 @@ class SudokuSquare:
         self.edit = edit
         self.xLoc = xLoc
         self.yLoc = yLoc
-        self.offsetX = offsetX
-        self.offsetY = offsetY
+
+    def set_number(self, number):
+        """
+        Show number (None for an empty square) the next time the square is drawn.
+        Returns the area of the screen the square covers, for dirty-rect updates.
+        """
+        self.number = number
+        if number != None:
+            number = str(number)
+            self.color = (2, 204, 186)
+        else:
+            number = ""
+            self.color = (255, 255, 255)
+        self.text = self.font.render(number, 1, (255, 255, 255))
+        self.textpos = self.text.get_rect()
+        self.textpos = self.textpos.move(self.offsetX + 17, self.offsetY + 4)
+        return self.rect.union(self.textpos)
 
     def draw(self):
         screen = pygame.display.get_surface()
-        AAfilledRoundedRect(screen, (self.offsetX, self.offsetY, 45, 40), self.color)
+        AAfilledRoundedRect(screen, self.rect, self.color)
 
         # screen.blit(self.collide, self.collideRect)
         screen.blit(self.text, self.textpos)
+        return self.rect.union(self.textpos)
 
 
     def checkCollide(self, collision):
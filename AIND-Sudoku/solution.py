@@ -1,4 +1,3 @@
-assignments = []
 rows = 'ABCDEFGHI'
 cols = '123456789'
 
@@ -19,23 +18,101 @@ unit_list = row_units + col_units + square_units + diagonal_units
 # Dict of units each box belongs to
 units = {box: [unit for unit in unit_list if box in unit] for box in boxes}
 
+# Dict of indexes into unit_list of the units each box belongs to
+unit_ids = {box: [i for i, unit in enumerate(unit_list) if box in unit] for box in boxes}
+
 # Dict of sets of peers each box has
 peers = {box: set(s for unit in units[box] for s in unit) - set([box]) for box in boxes}
 
+# Recorder that assign_value() reports to, None while tracing is off
+active_recorder = None
+
+
+class AssignmentRecorder(object):
+    """
+    Context manager that turns on tracing of the changes made by assign_value().
+
+    Only (box, old, new) deltas are stored, plus one starting board for every
+    solve or search branch, and the board snapshots are rebuilt on demand.
+    Example:
+        with AssignmentRecorder() as recorder:
+            solve(grid)
+        visualize_assignments(recorder.frames())
+    """
+
+    def __init__(self):
+        self.deltas = []
+        self._previous = None
+
+    def __enter__(self):
+        global active_recorder
+        self._previous = active_recorder
+        active_recorder = self
+        return self
 
-def assign_value(values, box, value):
+    def __exit__(self, *exc_info):
+        global active_recorder
+        active_recorder = self._previous
+        return False
+
+    def start(self, values):
+        """Remember the board that the following deltas are applied to."""
+        self.deltas.append((None, None, values.copy()))
+
+    def record(self, box, old, new):
+        """Remember that box changed from old to new."""
+        self.deltas.append((box, old, new))
+
+    def frames(self):
+        """
+        Replay the deltas.
+        Yields:
+            A copy of the board every time a box becomes single-valued.
+        """
+        values = {}
+        for box, old, new in self.deltas:
+            if box is None:
+                values = new.copy()
+                continue
+            values[box] = new
+            if len(new) == 1:
+                yield values.copy()
+
+
+def assign_value(values, box, value, trail=None):
     """
     Please use this function to update your values dictionary!
-    Assigns a value to a given box. If it updates the board record it.
+    Assigns a value to a given box. If it updates the board and an
+    AssignmentRecorder is active, record the change. If a trail list is
+    given, the old value is pushed onto it so undo() can roll it back.
     """
 
-    # Don't waste memory appending actions that don't actually change any values
+    # Don't waste memory recording actions that don't actually change any values
     if values[box] == value:
         return values
 
+    if active_recorder is not None:
+        active_recorder.record(box, values[box], value)
+    if trail is not None:
+        trail.append((box, values[box]))
     values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
+    return values
+
+def undo(values, trail, mark):
+    """
+    Roll back the changes pushed onto trail since it was mark entries long.
+    Args:
+        values(dict): the board the trail was recorded on
+        trail(list): a list of (box, old value) pairs filled by assign_value()
+        mark(int): the length of the trail to roll back to
+    Returns:
+        The values dictionary as it was at mark.
+    """
+    while len(trail) > mark:
+        box, old = trail.pop()
+        if active_recorder is not None:
+            active_recorder.record(box, values[box], old)
+        values[box] = old
     return values
 
 def naked_twins(values):
@@ -134,24 +211,51 @@ def only_choice(values):
     return values
 
 
-def reduce_puzzle(values):
-    """
-    Iterate eliminate() and only_choice(). If at some point, there is a box
-    with no available values, return False.
-    If the sudoku is solved, return the sudoku.
-    If after an iteration of both functions, the sudoku remains the same,
-    return the sudoku.
-    """
-    # Use number of solved values to determine if reduce_puzzle has stalled
-    stalled = False
-    while not stalled:
-        solved_values_before = len([b for b in boxes if len(values[b]) == 1])
-        values = eliminate(values)
-        values = only_choice(values)
-        solved_values_after = len([b for b in boxes if len(values[b]) == 1])
-        stalled = solved_values_before == solved_values_after
-        if len([b for b in boxes if len(values[b]) == 0]):
-            return False
+def reduce_puzzle(values, trail=None, solved=None, dirty=None):
+    """
+    Propagate eliminate() and only_choice() until nothing changes. If at some
+    point, there is a box with no available values, return False.
+    Otherwise return the reduced sudoku. Changes are pushed onto trail if given.
+
+    Propagation is driven by two work queues instead of full-board sweeps:
+    a newly solved box only revisits its peers, and only the units containing
+    a changed box are checked again for digits with a single place. Both
+    queues start full unless given, which lets a search branch on a reduced
+    board only propagate from the box it assigned.
+    Args:
+        solved(list): solved boxes whose digit still has to be removed from
+            their peers, consumed by the call
+        dirty(set): indices into unit_list of the units to check for only
+            choices, consumed by the call
+    """
+    # Solved boxes whose digit still has to be removed from their peers
+    if solved is None:
+        solved = [box for box in boxes if len(values[box]) == 1]
+    # Units that have to be checked for only choices
+    if dirty is None:
+        dirty = set(range(len(unit_list)))
+
+    while solved or dirty:
+        while solved:
+            box = solved.pop()
+            v = values[box]
+            for p in peers[box]:
+                if v in values[p]:
+                    new_value = values[p].replace(v, '')
+                    values = assign_value(values, p, new_value, trail)
+                    if not new_value:
+                        return False
+                    if len(new_value) == 1:
+                        solved.append(p)
+                    dirty.update(unit_ids[p])
+        if dirty:
+            u = unit_list[dirty.pop()]
+            for d in '123456789':
+                places = [b for b in u if d in values[b]]
+                if len(places) == 1 and values[places[0]] != d:
+                    values = assign_value(values, places[0], d, trail)
+                    solved.append(places[0])
+                    dirty.update(unit_ids[places[0]])
     return values
 
 def search(values):
@@ -170,36 +274,118 @@ def search(values):
 
     for digit in values[min_box]:
         attempt_values = values.copy()
+        if active_recorder is not None:
+            active_recorder.start(attempt_values)
         attempt_values = assign_value(attempt_values, min_box, digit)
         # Now use recursion to solve each one of the resulting sudokus, and if one returns a value (not False), return that answer!
         attempt = search(attempt_values)
         if attempt:
             return attempt
 
-def solve(grid):
+def search_in_place(values, trail=None, changed=None):
+    """
+    Depth-first search and propagation on one shared board. Instead of copying
+    the board for every digit tried, changes are pushed onto a trail and
+    rolled back with undo() when a branch fails.
+    Args:
+        values(dict): the board to solve, modified in place
+        trail(list): the trail to record changes on, a new one by default
+        changed(string): the only box changed since values was last reduced,
+            or None to reduce the whole board
+    Returns:
+        The solved values dictionary, or False if there is no solution, in
+        which case values is restored to its original state.
+    """
+    if trail is None:
+        trail = []
+    mark = len(trail)
+
+    if changed is None:
+        reduced = reduce_puzzle(values, trail)
+    else:
+        reduced = reduce_puzzle(values, trail, [changed], set(unit_ids[changed]))
+    if reduced is False:
+        undo(values, trail, mark)
+        return False
+
+    # Choose one of the unfilled squares with the fewest possibilities
+    unsolved = [(len(values[box]), box) for box in boxes if len(values[box]) > 1]
+    if not unsolved:
+        return values
+    m, min_box = min(unsolved)
+
+    for digit in values[min_box]:
+        branch = len(trail)
+        assign_value(values, min_box, digit, trail)
+        if search_in_place(values, trail, min_box):
+            return values
+        undo(values, trail, branch)
+
+    undo(values, trail, mark)
+    return False
+
+def solve(grid, backend='dict'):
     """
     Find the solution to a Sudoku grid.
     Args:
         grid(string): a string representing a sudoku grid.
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        backend(string): the engine to solve with, one of
+            'dict' - constraint propagation and search() on the values dictionary
+            'trail' - constraint propagation and search_in_place() on the values dictionary
+            'bitmask' - constraint propagation and search on candidate bitmasks (bitmask.py)
+            'dlx' - exact cover with Dancing Links (dlx.py)
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
     """
+    if backend == 'bitmask':
+        import bitmask
+        return bitmask.solve(grid)
+    if backend == 'dlx':
+        import dlx
+        return dlx.solve(grid)
+    if backend not in ('dict', 'trail'):
+        raise ValueError("Unknown backend: {}".format(backend))
+
     # Translate string grid to dict of boxes and values
     values = grid_values(grid)
+    if active_recorder is not None:
+        active_recorder.start(values)
 
     # Use search strategy on values
+    if backend == 'trail':
+        return search_in_place(values)
     solution = search(values)
 
     return solution
 
+def count_solutions(grid, limit=2, backend='bitmask'):
+    """
+    Count the solutions of a Sudoku grid without enumerating all of them.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): stop searching as soon as this many solutions are found,
+            so the default of 2 tells whether the solution is unique.
+        backend(string): 'bitmask' or 'dlx', see solve()
+    Returns:
+        The number of solutions, at most limit.
+    """
+    if backend == 'bitmask':
+        import bitmask
+        return bitmask.count_solutions(grid, limit)
+    if backend == 'dlx':
+        import dlx
+        return dlx.count_solutions(grid, limit)
+    raise ValueError("Unknown backend: {}".format(backend))
+
 if __name__ == '__main__':
     diag_sudoku_grid = '9.1....8.8.5.7..4.2.4....6...7......5..............83.3..6......9................'
-    display(solve(diag_sudoku_grid))
+    with AssignmentRecorder() as recorder:
+        display(solve(diag_sudoku_grid))
 
     try:
         from visualize import visualize_assignments
-        visualize_assignments(assignments)
+        visualize_assignments(recorder.frames())
 
     except SystemExit:
         pass
@@ -1,6 +1,21 @@
-import solution
+import importlib.util
+import io
+import os
+import random
+import tempfile
 import unittest
 
+import solution
+import bitmask
+import batch
+import dlx
+import geometry
+import strategies
+import benchmark
+import generator
+import sudoku_io
+import sudoku_trace
+
 
 class TestNakedTwins(unittest.TestCase):
     before_naked_twins_1 = {'I6': '4', 'H9': '3', 'I2': '6', 'E8': '1', 'H3': '5', 'H7': '8', 'I7': '1', 'I4': '8',
@@ -94,5 +109,251 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(solution.solve(self.diagonal_grid), self.solved_diag_sudoku)
 
+    def test_backends(self):
+        for backend in ('dict', 'trail', 'bitmask', 'dlx'):
+            self.assertEqual(solution.solve(self.diagonal_grid, backend=backend), self.solved_diag_sudoku)
+        self.assertFalse(solution.solve('11' + '.' * 79, backend='dlx'))
+        self.assertRaises(ValueError, solution.solve, self.diagonal_grid, backend='nope')
+
+
+class TestReducePuzzle(unittest.TestCase):
+
+    def test_reaches_fixed_point(self):
+        values = solution.reduce_puzzle(solution.grid_values(TestDiagonalSudoku.diagonal_grid))
+        swept = solution.only_choice(solution.eliminate(values.copy()))
+        self.assertEqual(values, swept)
+        masks = bitmask.reduce_puzzle(bitmask.grid_masks(TestDiagonalSudoku.diagonal_grid))
+        self.assertEqual(bitmask.masks_values(masks), values)
+
+    def test_contradiction(self):
+        self.assertFalse(solution.reduce_puzzle(solution.grid_values('11' + '.' * 79)))
+        self.assertFalse(bitmask.reduce_puzzle(bitmask.grid_masks('11' + '.' * 79)))
+
+
+class TestSearchInPlace(unittest.TestCase):
+
+    def test_matches_search(self):
+        values = solution.grid_values(TestDiagonalSudoku.diagonal_grid)
+        self.assertEqual(solution.search_in_place(values), TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertEqual(values, TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_failure_restores_board(self):
+        values = solution.grid_values('11' + '.' * 79)
+        self.assertFalse(solution.search_in_place(values))
+        self.assertEqual(values, solution.grid_values('11' + '.' * 79))
+
+
+class TestCountSolutions(unittest.TestCase):
+
+    def test_unique(self):
+        for backend in ('bitmask', 'dlx'):
+            self.assertEqual(solution.count_solutions(TestDiagonalSudoku.diagonal_grid, backend=backend), 1)
+
+    def test_limit(self):
+        for backend in ('bitmask', 'dlx'):
+            self.assertEqual(solution.count_solutions('.' * 81, backend=backend), 2)
+            self.assertEqual(solution.count_solutions('.' * 81, limit=5, backend=backend), 5)
+            self.assertEqual(solution.count_solutions('11' + '.' * 79, backend=backend), 0)
+
+    def test_count_all(self):
+        g = geometry.get_geometry(2, diagonal=False)
+        self.assertEqual(bitmask.count_solutions('.' * 16, limit=None, geometry=g), 288)
+        self.assertEqual(dlx.count_solutions('.' * 16, limit=None, geometry=g), 288)
+
+
+class TestAssignmentRecorder(unittest.TestCase):
+
+    def test_frames_replay_solution(self):
+        with solution.AssignmentRecorder() as recorder:
+            result = solution.solve(TestDiagonalSudoku.diagonal_grid)
+        frames = list(recorder.frames())
+        self.assertTrue(frames)
+        self.assertEqual(frames[-1], result)
+
+    def test_off_by_default(self):
+        self.assertIsNone(solution.active_recorder)
+        with solution.AssignmentRecorder():
+            pass
+        self.assertIsNone(solution.active_recorder)
+
+
+class TestBitmaskEngine(unittest.TestCase):
+
+    def test_solve(self):
+        self.assertEqual(bitmask.solve(TestDiagonalSudoku.diagonal_grid), TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_naked_twins(self):
+        masks = bitmask.values_masks(TestNakedTwins.before_naked_twins_1)
+        self.assertTrue(bitmask.masks_values(bitmask.naked_twins(masks)) in TestNakedTwins.possible_solutions_1)
+
+
+class TestGeometry(unittest.TestCase):
+
+    def assertValid(self, g, values):
+        for unit in g.unit_list:
+            self.assertEqual(sorted(values[g.boxes[i]] for i in unit), sorted(g.digits))
+
+    def test_classic_tables(self):
+        g = geometry.get_geometry(3, diagonal=True)
+        self.assertEqual(g.boxes, solution.boxes)
+        self.assertEqual(sorted(sorted(g.boxes[i] for i in unit) for unit in g.unit_list),
+                         sorted(sorted(unit) for unit in solution.unit_list))
+
+    def test_larger_boards(self):
+        for n, diagonal in ((2, True), (4, False), (4, True)):
+            g = geometry.get_geometry(n, diagonal)
+            self.assertValid(g, bitmask.solve('.' * g.cells, g))
+            self.assertValid(g, dlx.solve('.' * g.cells, g))
+
+
+class TestStrategies(unittest.TestCase):
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_naked_pairs(self):
+        masks = bitmask.values_masks(TestNakedTwins.before_naked_twins_2)
+        strategies.naked_pairs(masks, geometry.DIAGONAL)
+        self.assertTrue(bitmask.masks_values(masks) in TestNakedTwins.possible_solutions_2)
+
+    def test_pipeline_solves_with_stats(self):
+        g = geometry.get_geometry(3, diagonal=False)
+        stats = strategies.StrategyStats()
+        result = bitmask.solve(self.hard_grid, g, strategies.PIPELINE, stats)
+        self.assertEqual(result, dlx.solve(self.hard_grid, g))
+        report = stats.report()
+        self.assertTrue(report['eliminate']['fired'] > 0)
+        self.assertTrue(report['naked_pairs']['calls'] >= report['naked_pairs']['fired'])
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run_corpus(self):
+        grids = list(sudoku_io.read_grids(benchmark.corpus_path('17clue')))[:3]
+        report = benchmark.run_corpus(grids, geometry.get_geometry(3, diagonal=False),
+                                      steps=strategies.pipeline('naked_pairs'))
+        self.assertEqual(report['solved'], 3)
+        self.assertTrue(report['nodes']['total'] >= 3)
+        self.assertEqual(set(report['latency_ms']), {'p50', 'p90', 'p99', 'mean', 'max', 'total'})
+        self.assertTrue({'eliminate', 'only_choice', 'naked_pairs'} <= set(report['phases']))
+
+    def test_solution_backends(self):
+        grids = list(sudoku_io.read_grids(benchmark.corpus_path('diagonal')))[:5]
+        for backend in ('dict', 'trail'):
+            report = benchmark.run_corpus(grids, geometry.get_geometry(3), backend)
+            self.assertEqual(report['solved'], 5)
+            self.assertIsInstance(report['phases'], str)
+            with self.assertRaises(ValueError):
+                benchmark.run_corpus(grids, geometry.get_geometry(3, diagonal=False), backend)
+        self.assertEqual(benchmark.run_corpus([], geometry.get_geometry(3), 'dict'), {'puzzles': 0, 'solved': 0})
+        # Standard puzzles have no diagonal solution, which is refused rather than timed
+        with self.assertRaises(SystemExit):
+            benchmark.main(['easy', '--backend', 'dict', '--diagonal'])
+
+    def test_percentiles(self):
+        self.assertEqual(benchmark.percentiles(range(1, 101)), {'p50': 50, 'p90': 90, 'p99': 99})
+
+
+class TestSolveMany(unittest.TestCase):
+
+    def test_results_in_input_order(self):
+        grids = [TestDiagonalSudoku.diagonal_grid, '.' * 81, TestDiagonalSudoku.diagonal_grid]
+        results = list(batch.solve_many(grids, workers=2, chunksize=1))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertEqual(results[1], solution.solve('.' * 81))
+        self.assertEqual(results[2], TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_grid_strings_one_to_one(self):
+        grid = TestDiagonalSudoku.diagonal_grid
+        grids = [grid, grid[:-1] + 'x', '.' * 81]
+        results = list(batch.solve_many(grids, workers=1))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertEqual(results[1], solution.solve(grids[1]))
+
+
+class TestSudokuIO(unittest.TestCase):
+    grid = TestDiagonalSudoku.diagonal_grid
+
+    def test_read_formats(self):
+        rows = [self.grid[r:r + 9] for r in range(0, 81, 9)]
+        drawing = ['Grid 01'] + [' '.join(row[:3]) + ' | ' + ' '.join(row[3:6]) + ' | ' + ' '.join(row[6:])
+                                 for row in rows]
+        drawing.insert(4, '------+-------+------')
+        lines = ['# header', '', self.grid.replace('.', '0') + '  # rating 1.5'] + drawing
+        self.assertEqual(list(sudoku_io.read_grids(lines)), [self.grid, self.grid])
+
+    def test_trailing_columns(self):
+        lines = [self.grid + ' hard', self.grid + '\t1.5', self.grid + ',easy', self.grid.replace('.', '0')]
+        self.assertEqual(list(sudoku_io.read_grids(lines)), [self.grid] * 4)
+
+    def test_text_in_grid(self):
+        with self.assertRaises(ValueError) as raised:
+            list(sudoku_io.read_grids(['Grid 01', self.grid[:40] + 'x' + self.grid[41:]]))
+        self.assertIn('Line 2', str(raised.exception))
+
+    def test_incomplete_grid(self):
+        with self.assertRaises(ValueError):
+            list(sudoku_io.read_grids([self.grid[:40]]))
+
+    def test_write_solutions(self):
+        out = io.StringIO()
+        unsolved = sudoku_io.write_solutions([self.grid, '11' + '.' * 79],
+                                             [TestDiagonalSudoku.solved_diag_sudoku, False], out)
+        self.assertEqual(unsolved, 1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], sudoku_io.values_grid(TestDiagonalSudoku.solved_diag_sudoku))
+        self.assertTrue(lines[1].startswith('#'))
+        self.assertEqual(list(sudoku_io.read_grids(lines)), [lines[0]])
+
+
+class TestTrace(unittest.TestCase):
+
+    def test_record_and_replay(self):
+        grid = TestDiagonalSudoku.diagonal_grid
+        g = geometry.DIAGONAL
+        traces = []
+        for name in ('trace.jsonl', 'trace.bin'):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, name)
+                count, solved = sudoku_trace.record(grid, path, g, strategies.PIPELINE)
+                self.assertTrue(solved)
+                header, records = sudoku_trace.read_trace(path)
+                traces.append((header, list(records)))
+                self.assertEqual(len(traces[-1][1]), count)
+        self.assertEqual(traces[0], traces[1])
+
+        header, records = traces[0]
+        self.assertEqual(header['masks'], g.grid_masks(grid))
+        for masks, record in sudoku_trace.replay(header, records):
+            if record['strategy'] != 'backtrack':
+                self.assertEqual(record['before'] & record['after'], record['after'])
+        self.assertEqual(g.masks_values(masks), TestDiagonalSudoku.solved_diag_sudoku)
+
+    @unittest.skipIf(importlib.util.find_spec('PIL') is None, "Pillow is not installed")
+    def test_render(self):
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as tmp:
+            trace, image = os.path.join(tmp, 'trace.bin'), os.path.join(tmp, 'trace.gif')
+            sudoku_trace.record(TestDiagonalSudoku.diagonal_grid, trace, geometry.DIAGONAL)
+            frames = sudoku_trace.render(trace, image, every=2)
+            with Image.open(image) as gif:
+                self.assertEqual(gif.n_frames, frames)
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_unique_solution(self):
+        rnd = random.Random(0)
+        for g in (geometry.DIAGONAL, geometry.get_geometry(3, diagonal=False)):
+            grid, level = generator.generate(g, rnd=rnd)
+            self.assertEqual(bitmask.count_solutions(grid, geometry=g), 1)
+            self.assertEqual(generator.grade(grid, g)[0], level)
+
+    def test_difficulty(self):
+        grid, level = generator.generate(difficulty='easy', rnd=random.Random(1))
+        self.assertEqual(level, 'easy')
+        self.assertTrue(set(generator.grade(grid)[1]) <= {'eliminate', 'only_choice'})
+        self.assertEqual(generator.grade('.' * 81)[0], 'expert')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,216 @@
+"""
+Additional propagation strategies for the bitmask engine.
+
+Every strategy takes the candidate masks and the SudokuGeometry of the board,
+removes candidates in place and returns the list of boxes it changed (empty
+if it did not fire). bitmask.reduce_puzzle() runs a pipeline of them, in
+order, whenever eliminate and only choice have nothing left to do.
+"""
+import time
+from itertools import combinations
+
+
+def naked_subsets(masks, geometry, k):
+    """
+    Eliminate naked subsets of size k: if k boxes of a unit only hold the
+    same k digits between them, no other box of the unit can hold them.
+    """
+    bit_count = geometry.bit_count
+    changed = []
+    for unit in geometry.unit_list:
+        candidates = [i for i in unit if 1 < bit_count[masks[i]] <= k]
+        if len(candidates) < k:
+            continue
+        for subset in combinations(candidates, k):
+            union = 0
+            for i in subset:
+                union |= masks[i]
+            if bit_count[union] != k:
+                continue
+            for p in unit:
+                if masks[p] & union and p not in subset:
+                    masks[p] &= ~union
+                    changed.append(p)
+    return changed
+
+def naked_pairs(masks, geometry):
+    """Naked subsets of two boxes, the naked twins of solution.py."""
+    return naked_subsets(masks, geometry, 2)
+
+def naked_triples(masks, geometry):
+    """Naked subsets of three boxes."""
+    return naked_subsets(masks, geometry, 3)
+
+def hidden_subsets(masks, geometry, k):
+    """
+    Restrict hidden subsets of size k: if k digits of a unit only fit in the
+    same k boxes between them, those boxes cannot hold any other digit.
+    """
+    bit_count = geometry.bit_count
+    size = geometry.size
+    changed = []
+    for unit in geometry.unit_list:
+        # For every unsolved digit, the mask of unit positions it fits in
+        places = {}
+        for d in range(size):
+            bit = 1 << d
+            where = 0
+            for pos, i in enumerate(unit):
+                if masks[i] & bit:
+                    where |= 1 << pos
+            if 1 < bin(where).count('1') <= k:
+                places[bit] = where
+        if len(places) < k:
+            continue
+        for subset in combinations(places, k):
+            where = 0
+            for bit in subset:
+                where |= places[bit]
+            if bin(where).count('1') != k:
+                continue
+            keep = sum(subset)
+            for pos, i in enumerate(unit):
+                if where >> pos & 1 and masks[i] & ~keep:
+                    masks[i] &= keep
+                    changed.append(i)
+    return changed
+
+def hidden_pairs(masks, geometry):
+    """Hidden subsets of two digits."""
+    return hidden_subsets(masks, geometry, 2)
+
+def hidden_triples(masks, geometry):
+    """Hidden subsets of three digits."""
+    return hidden_subsets(masks, geometry, 3)
+
+_intersections = {}
+
+def intersections(geometry):
+    """
+    Precompute the overlaps of squares with rows, columns and diagonals.
+    Returns:
+        A dict with two lists of (rest of a, a and b, rest of b) index tuples:
+        'pointing' where a is a square and b a line, and 'box_line' where a
+        is a line and b a square.
+    """
+    if geometry not in _intersections:
+        lines = geometry.row_units + geometry.col_units + geometry.diagonal_units
+        pointing, box_line = [], []
+        for square in geometry.square_units:
+            for line in lines:
+                both = tuple(i for i in square if i in line)
+                if len(both) < 2:
+                    continue
+                square_rest = tuple(i for i in square if i not in both)
+                line_rest = tuple(i for i in line if i not in both)
+                pointing.append((square_rest, both, line_rest))
+                box_line.append((line_rest, both, square_rest))
+        _intersections[geometry] = {'pointing': pointing, 'box_line': box_line}
+    return _intersections[geometry]
+
+def _intersection_removal(masks, overlaps):
+    """Remove digits confined to a and b from the rest of b."""
+    changed = []
+    for a_rest, both, b_rest in overlaps:
+        inside = outside = 0
+        for i in both:
+            inside |= masks[i]
+        for i in a_rest:
+            outside |= masks[i]
+        confined = inside & ~outside
+        if not confined:
+            continue
+        for i in b_rest:
+            if masks[i] & confined:
+                masks[i] &= ~confined
+                changed.append(i)
+    return changed
+
+def pointing_pairs(masks, geometry):
+    """
+    If a digit of a square only fits where the square meets a row, column or
+    diagonal, remove it from the rest of that line.
+    """
+    return _intersection_removal(masks, intersections(geometry)['pointing'])
+
+def box_line_reduction(masks, geometry):
+    """
+    If a digit of a row, column or diagonal only fits where the line meets a
+    square, remove it from the rest of that square.
+    """
+    return _intersection_removal(masks, intersections(geometry)['box_line'])
+
+def _x_wing(masks, geometry, base_units, cover_units):
+    changed = []
+    for d in range(geometry.size):
+        bit = 1 << d
+        # Base lines where the digit fits in exactly two places
+        pairs = {}
+        for b, unit in enumerate(base_units):
+            where = [pos for pos, i in enumerate(unit) if masks[i] & bit]
+            if len(where) == 2:
+                pairs.setdefault(tuple(where), []).append(b)
+        for where, bases in pairs.items():
+            if len(bases) != 2:
+                continue
+            for pos in where:
+                for b, i in enumerate(cover_units[pos]):
+                    if b not in bases and masks[i] & bit:
+                        masks[i] &= ~bit
+                        changed.append(i)
+    return changed
+
+def x_wing(masks, geometry):
+    """
+    If a digit fits in exactly the same two columns of two rows, it cannot go
+    anywhere else in those columns, and the same with rows and columns swapped.
+    """
+    return (_x_wing(masks, geometry, geometry.row_units, geometry.col_units) +
+            _x_wing(masks, geometry, geometry.col_units, geometry.row_units))
+
+# Default pipeline, cheapest strategies first
+PIPELINE = (naked_pairs, pointing_pairs, box_line_reduction, hidden_pairs,
+            naked_triples, hidden_triples, x_wing)
+
+def pipeline(names):
+    """Turn a comma separated list of strategy names into a pipeline tuple."""
+    if names == 'all':
+        return PIPELINE
+    if names in ('', 'none'):
+        return ()
+    return tuple(globals()[name] for name in names.split(','))
+
+
+class StrategyStats(object):
+    """
+    How often each propagation step was tried, how often it fired and the
+    total time spent in it, keyed by strategy name. bitmask.search() also
+    counts the search nodes it expanded and the branches it backtracked
+    from, and times choosing a box to branch on as 'branching'.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.fired = {}
+        self.seconds = {}
+        self.nodes = 0
+        self.backtracks = 0
+
+    def add(self, name, fired, seconds):
+        """Count one call of a strategy."""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.fired[name] = self.fired.get(name, 0) + bool(fired)
+        self.seconds[name] = self.seconds.get(name, 0.) + seconds
+
+    def run(self, strategy, masks, geometry):
+        """Call strategy(masks, geometry) and count it."""
+        start = time.perf_counter()
+        changed = strategy(masks, geometry)
+        self.add(strategy.__name__, changed, time.perf_counter() - start)
+        return changed
+
+    def report(self):
+        """Return the statistics as a dict of {name: {'calls', 'fired', 'seconds'}}."""
+        return {name: {'calls': self.calls[name], 'fired': self.fired[name],
+                       'seconds': self.seconds[name]}
+                for name in self.calls}
@@ -0,0 +1,127 @@
+"""
+Streaming reader and writer for files of Sudoku puzzles.
+
+Puzzles are read one line at a time and yielded as soon as they are complete,
+so files of any size are solved in constant memory. The reader accepts the
+common dump formats:
+
+    one grid per line, '.' or '0' for empty boxes, optionally followed by
+    other columns such as a rating
+    grids spread over several lines, with '|', '-', '+' or spaces as separators
+    comment lines starting with '#' and text lines such as 'Grid 01', which are skipped
+
+Lines that mix boxes with other text before a grid is complete are errors.
+
+Solutions are written back one grid per line, in the same format.
+"""
+import sys
+
+from geometry import BLANKS, DIAGONAL
+
+# Characters of grid drawings that are not boxes
+SEPARATORS = '|+-=_'
+
+
+def _open(source, mode):
+    """Return a file object for source and whether the caller has to close it."""
+    if source is None or source == '-':
+        return (sys.stdin if 'r' in mode else sys.stdout), False
+    if isinstance(source, str):
+        return open(source, mode), True
+    return source, False
+
+def _line_cells(line, geometry):
+    """
+    The boxes of one line of input.
+    Returns:
+        A list of digits and '.' for empties, up to the first character that
+        is neither a box nor a separator, and whether the line has such text
+        after the boxes. Comments are not text.
+    """
+    line = line.split('#', 1)[0]
+    cells = []
+    for char in line:
+        if char in geometry.digit_bit:
+            cells.append(char)
+        elif char in BLANKS:
+            cells.append('.')
+        elif not char.isspace() and char not in SEPARATORS:
+            return cells, True
+    return cells, False
+
+def read_grids(source=None, geometry=DIAGONAL):
+    """
+    Yield puzzles one at a time from a file, stdin or an iterable of lines.
+    Args:
+        source: the name of a file, '-' or None for stdin, an open file, or an
+            iterable of lines such as a list of grid strings
+        geometry(SudokuGeometry): the board of the puzzles, for the number of
+            boxes and the digit alphabet
+    Yields:
+        Grid strings of geometry.cells characters with '.' for empty boxes.
+    Raises:
+        ValueError: for a line that mixes boxes with other text before a grid
+            is complete, or for an incomplete grid at the end of input.
+    """
+    f, close = _open(source, 'r')
+    try:
+        cells = []
+        for number, line in enumerate(f, 1):
+            line_cells, text = _line_cells(line, geometry)
+            # A one-line grid may be followed by a rating or other columns
+            if not cells and len(line_cells) >= geometry.cells:
+                yield ''.join(line_cells[:geometry.cells])
+                continue
+            if text:
+                # Text lines such as 'Grid 01' start with text
+                if not line_cells:
+                    continue
+                raise ValueError("Line {}: unexpected text in grid: {!r}".format(number, line.strip()))
+            cells.extend(line_cells)
+            if len(cells) > geometry.cells:
+                raise ValueError("Line {}: grid has more than {} boxes".format(number, geometry.cells))
+            if len(cells) == geometry.cells:
+                yield ''.join(cells)
+                cells = []
+        if cells:
+            raise ValueError("Incomplete grid of {} boxes at end of input".format(len(cells)))
+    finally:
+        if close:
+            f.close()
+
+def values_grid(values, geometry=DIAGONAL):
+    """
+    Convert a values dict into a one-line grid string.
+    Args:
+        values(dict): a dictionary of the form {'box_name': '123456789', ...}
+        geometry(SudokuGeometry): the board the values belong to
+    Returns:
+        The boxes in board order, '.' for unsolved boxes.
+    """
+    return ''.join(values[box] if len(values[box]) == 1 else '.' for box in geometry.boxes)
+
+def write_solutions(puzzles, results, out=None, geometry=DIAGONAL):
+    """
+    Write one solution per line as results come in.
+    Args:
+        puzzles: the grid strings that were solved
+        results: the solve() result of every puzzle, a values dict or False
+        out: the name of a file, '-' or None for stdout, or an open file
+        geometry(SudokuGeometry): the board of the puzzles
+    Returns:
+        The number of puzzles that had no solution. They are written as
+        '# no solution: <puzzle>' comment lines, which read_grids() skips.
+    """
+    f, close = _open(out, 'w')
+    unsolved = 0
+    try:
+        for puzzle, values in zip(puzzles, results):
+            if values:
+                f.write(values_grid(values, geometry) + '\n')
+            else:
+                unsolved += 1
+                f.write('# no solution: {}\n'.format(puzzle))
+    finally:
+        if close:
+            f.close()
+    return unsolved
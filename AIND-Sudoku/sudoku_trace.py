@@ -0,0 +1,280 @@
+"""
+Headless traces of bitmask engine runs.
+
+A trace starts with a header holding the board geometry and the candidate
+masks of the puzzle, followed by one record for every change of a mask:
+
+    box       board index of the box that changed
+    before    its candidate mask before the change
+    after     its candidate mask after the change
+    strategy  'eliminate', 'only_choice', the name of a strategies.py step,
+              'search' when a branch picks a digit or 'backtrack' when the
+              search returns from a branch without a solution
+    depth     search depth of the change, 0 before the first branch
+
+Records are streamed to the file as the solver runs, so nothing but the
+current board is kept in memory. Traces are written as JSON lines, or in a
+compact binary format when the file name ends in '.bin'.
+
+Usage:
+    python sudoku_trace.py record <grid or puzzle file> trace.jsonl [--strategies all] [--standard]
+    python sudoku_trace.py render trace.jsonl solve.gif [--every N] [--duration MS]
+
+Rendering needs Pillow.
+"""
+import argparse
+import json
+import os
+import struct
+
+import bitmask
+from geometry import get_geometry
+from strategies import pipeline
+from sudoku_io import read_grids
+
+MAGIC = b'SDKT\x01'
+# n, diagonal, number of boxes
+HEADER = struct.Struct('<BBH')
+MASK = struct.Struct('<I')
+# box, before, after, strategy id, depth
+RECORD = struct.Struct('<HIIBH')
+# A box of NAME_BOX announces the name of the next strategy id
+NAME_BOX = 0xFFFF
+NAME = struct.Struct('<HB')
+
+
+class TraceWriter(object):
+    """
+    The trace callable for bitmask.search(), writing every record to a file.
+    Example:
+        with TraceWriter('trace.jsonl', geometry) as trace:
+            trace.start(masks)
+            bitmask.search(masks, geometry, trace=trace)
+    """
+
+    def __init__(self, path, geometry, binary=None):
+        """
+        Args:
+            path(string): the file to write
+            geometry(SudokuGeometry): the board being solved
+            binary(bool): write the binary format, by default if path ends in '.bin'
+        """
+        if binary is None:
+            binary = path.endswith('.bin')
+        self.geometry = geometry
+        self.binary = binary
+        self.file = open(path, 'wb' if binary else 'w')
+        self.strategy_ids = {}
+        self.records = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self.file.close()
+
+    def start(self, masks):
+        """Write the header with the candidate masks of the puzzle."""
+        g = self.geometry
+        if self.binary:
+            self.file.write(MAGIC + HEADER.pack(g.n, g.diagonal, g.cells))
+            self.file.write(b''.join(MASK.pack(m) for m in masks))
+        else:
+            self.file.write(json.dumps({'n': g.n, 'diagonal': g.diagonal, 'masks': list(masks)}) + '\n')
+
+    def __call__(self, box, before, after, strategy, depth):
+        self.records += 1
+        if not self.binary:
+            self.file.write(json.dumps({'box': box, 'before': before, 'after': after,
+                                        'strategy': strategy, 'depth': depth}) + '\n')
+            return
+        if strategy not in self.strategy_ids:
+            self.strategy_ids[strategy] = len(self.strategy_ids)
+            name = strategy.encode('utf-8')
+            self.file.write(NAME.pack(NAME_BOX, len(name)) + name)
+        self.file.write(RECORD.pack(box, before, after, self.strategy_ids[strategy], depth))
+
+
+def _read_binary(f):
+    n, diagonal, cells = HEADER.unpack(f.read(HEADER.size))
+    masks = [MASK.unpack(f.read(MASK.size))[0] for _ in range(cells)]
+    header = {'n': n, 'diagonal': bool(diagonal), 'masks': masks}
+
+    def records():
+        names = []
+        while True:
+            chunk = f.read(NAME.size)
+            if len(chunk) < NAME.size:
+                return
+            box, length = NAME.unpack(chunk)
+            if box == NAME_BOX:
+                names.append(f.read(length).decode('utf-8'))
+                continue
+            chunk += f.read(RECORD.size - NAME.size)
+            box, before, after, strategy, depth = RECORD.unpack(chunk)
+            yield {'box': box, 'before': before, 'after': after,
+                   'strategy': names[strategy], 'depth': depth}
+    return header, records()
+
+def read_trace(path):
+    """
+    Read a trace written by TraceWriter, in either format.
+    Returns:
+        The header dict ('n', 'diagonal', 'masks') and a generator of record
+        dicts, read lazily from the file.
+    """
+    f = open(path, 'rb')
+    if f.read(len(MAGIC)) == MAGIC:
+        header, records = _read_binary(f)
+    else:
+        f.close()
+        f = open(path)
+        header = json.loads(f.readline())
+        records = (json.loads(line) for line in f)
+
+    def closing():
+        try:
+            for record in records:
+                yield record
+        finally:
+            f.close()
+    return header, closing()
+
+def replay(header, records):
+    """
+    Apply the records of a trace to the board of its header.
+    Yields:
+        The board after every record, as a list of masks, and the record.
+        The list is reused, copy it to keep it.
+    """
+    # The board at every depth of the current search path
+    boards = [list(header['masks'])]
+    for record in records:
+        depth = record['depth']
+        del boards[depth + 1:]
+        if record['strategy'] == 'search':
+            del boards[depth:]
+            boards.append(boards[-1][:])
+        boards[depth][record['box']] = record['after']
+        yield boards[depth], record
+
+def record(grid, path, geometry, strategies=(), binary=None):
+    """
+    Solve grid with the bitmask engine and write its trace to path.
+    Returns:
+        The number of records written and whether the puzzle was solved.
+    """
+    masks = geometry.grid_masks(grid)
+    with TraceWriter(path, geometry, binary) as trace:
+        trace.start(masks)
+        solved = bitmask.search(masks, geometry, strategies, trace=trace) is not False
+    return trace.records, solved
+
+
+# Colours of the box a frame changed, by strategy
+COLORS = {'search': (230, 140, 0), 'backtrack': (220, 40, 40)}
+CHANGED = (2, 204, 186)
+
+def render(path, out, every=1, duration=100, cell=40):
+    """
+    Render a trace to an animated GIF, one frame for every record that solves
+    a box or branches, and every other frame if every > 1.
+
+    Pillow's GIF writer keeps every frame until the file is complete, as a
+    palette image of one byte per pixel, so memory still grows with the
+    number of frames: about 40 MB for 300 frames of the default size. Use
+    every to render long traces.
+    Args:
+        path(string): the trace file
+        out(string): the image to write
+        every(int): keep one frame out of every
+        duration(int): milliseconds per frame
+        cell(int): size of a box in pixels
+    Returns:
+        The number of frames rendered.
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        raise SystemExit("Rendering a trace needs Pillow, install it with 'pip install Pillow'")
+
+    header, records = read_trace(path)
+    g = get_geometry(header['n'], header['diagonal'])
+    givens = [g.bit_count[m] == 1 for m in header['masks']]
+    font = ImageFont.load_default()
+    side = g.size * cell
+
+    def draw(masks, record):
+        image = Image.new('RGB', (side, side + cell // 2), 'white')
+        d = ImageDraw.Draw(image)
+        r, c = divmod(record['box'], g.size)
+        d.rectangle([c * cell, r * cell, (c + 1) * cell, (r + 1) * cell],
+                    fill=COLORS.get(record['strategy'], CHANGED))
+        for i, m in enumerate(masks):
+            if g.bit_count[m] == 1:
+                r, c = divmod(i, g.size)
+                d.text((c * cell + cell // 3, r * cell + cell // 4), g.mask_digits[m],
+                       fill='black' if givens[i] else (40, 80, 200), font=font)
+        for k in range(g.size + 1):
+            width = 3 if k % g.n == 0 else 1
+            d.line([(k * cell, 0), (k * cell, side)], fill='black', width=width)
+            d.line([(0, k * cell), (side, k * cell)], fill='black', width=width)
+        d.text((4, side + 4), '{} depth {}'.format(record['strategy'], record['depth']),
+               fill='black', font=font)
+        return image
+
+    # Frames are drawn as Pillow converts them, so the RGB drawings are not
+    # kept alongside its palette copies
+    rendered = [0]
+
+    def frames():
+        shown = 0
+        for masks, rec in replay(header, records):
+            if g.bit_count[rec['after']] != 1 and rec['strategy'] != 'backtrack':
+                continue
+            shown += 1
+            if shown % every == 0:
+                rendered[0] += 1
+                yield draw(masks, rec)
+
+    images = frames()
+    first = next(images, None)
+    if first is None:
+        raise SystemExit("The trace has no frames to render")
+    first.save(out, save_all=True, append_images=images, duration=duration, loop=0)
+    return rendered[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and render bitmask engine traces.")
+    commands = parser.add_subparsers(dest='command')
+    rec = commands.add_parser('record', help="solve a puzzle and write its trace")
+    rec.add_argument('puzzle', help="a grid string, or a puzzle file to take the first grid of")
+    rec.add_argument('trace', help="the trace file, binary if it ends in .bin")
+    rec.add_argument('--strategies', default='none',
+                     help="comma separated strategies from strategies.py, 'all' or 'none'")
+    rec.add_argument('--standard', action='store_true', help="without the diagonal units")
+    ren = commands.add_parser('render', help="render a trace to an animated GIF")
+    ren.add_argument('trace')
+    ren.add_argument('image')
+    ren.add_argument('--every', type=int, default=1, help="keep one frame out of every N")
+    ren.add_argument('--duration', type=int, default=100, help="milliseconds per frame")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        geometry = get_geometry(3, diagonal=not args.standard)
+        grid = args.puzzle
+        if os.path.exists(grid):
+            grid = next(read_grids(grid, geometry))
+        records, solved = record(grid, args.trace, geometry, pipeline(args.strategies))
+        print("{} records, {}".format(records, 'solved' if solved else 'no solution'))
+    elif args.command == 'render':
+        print("{} frames".format(render(args.trace, args.image, args.every, args.duration)))
+    else:
+        parser.print_help()
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,19 @@
 from PySudoku import play
 
-def visualize_assignments(assignments):
-    """ Visualizes the set of assignments created by the Sudoku AI"""
-    last_assignment = None
-    filtered_assignments = []
-
-    for i in range(len(assignments)):
-        if last_assignment:
-            last_assignment_items = [item for item in last_assignment.items() if len(item[1]) == 1]
-            current_assignment_items = [item for item in assignments[i].items() if len(item[1]) == 1]
-            shared_items = set(last_assignment_items) & set(current_assignment_items)
-            if len(shared_items) < len(current_assignment_items):
-                filtered_assignments.append(assignments[i])
-        last_assignment = assignments[i]
+def new_solutions(assignments):
+    """
+    Lazily drop the snapshots that solve no new box.
+    Yields:
+        Every snapshot after the first with a solved box that was not solved,
+        or held another digit, in the snapshot before it.
+    """
+    last_solved = None
+    for assignment in assignments:
+        solved = set(item for item in assignment.items() if len(item[1]) == 1)
+        if last_solved is not None and not solved <= last_solved:
+            yield assignment
+        last_solved = solved
 
-    play(filtered_assignments)
+def visualize_assignments(assignments):
+    """ Visualizes the board snapshots created by the Sudoku AI, e.g. AssignmentRecorder.frames()"""
+    play(new_solutions(assignments))